@@ -0,0 +1,117 @@
+"""
+Benchmarks of list and detail views, display values, buttons and relative urls with the models in tests.models.
+"""
+from django_crud.controllers import RichController
+from django_crud.rich_views import ItemDisplayMixin, RichViewMixin
+from tests.models import Article, Section, Tag
+from .helpers import get_request, render
+
+ROWS = 200
+
+
+class ArticleController(RichController):
+    model = Article
+    list_display_items = ['link|title', 'slug', 'func|title_length']
+    detail_display_items = ['title', 'slug', 'body']
+    sortable_items = ['title', 'slug']
+
+    def title_length(self, obj):
+        return len(obj.title)
+    title_length.short_description = 'Length'
+
+
+class NativeArticleController(ArticleController):
+    native_rows = True
+
+
+class JsonTagController(RichController):
+    model = Tag
+    json_api = True
+    list_display_items = ['name', 'articles']
+
+
+class SectionDisplay(ItemDisplayMixin):
+    model = Section
+    display_items = ['text', 'article', 'article__title', 'article__slug']
+
+
+class ButtonsView(RichViewMixin):
+    model = Article
+    buttons = [
+        {'text': 'List', 'url': 'rev|articles-list'},
+        {'text': 'Details', 'url': 'rev|articles-details'},
+        'func|update_url',
+        {'text': 'More', 'dropdown': [
+            {'text': 'Create', 'url': 'rev|articles-create'},
+            {'text': 'Home', 'url': '/'},
+        ]},
+    ]
+
+    def update_url(self):
+        return '/articles/update/{}/'.format(self.object.pk)
+    update_url.short_description = 'Update {verbose_name}'
+
+
+#: objects loaded by setup so display benchmarks don't include queries
+articles, sections = [], []
+
+
+def setup():
+    Article.objects.bulk_create(
+        Article(title='article {}'.format(i), body='body of article {}'.format(i), slug='a{}'.format(i))
+        for i in range(ROWS))
+    articles[:] = Article.objects.order_by('pk')
+    Section.objects.bulk_create(Section(article=a, text='section of {}'.format(a.title)) for a in articles)
+    sections[:] = Section.objects.select_related('article').order_by('pk')
+    for i in range(20):
+        Tag.objects.create(name='tag {}'.format(i)).articles.add(*articles[i::20])
+
+
+def bench_list_page():
+    render('articles-list')
+
+
+def bench_list_page_sorted():
+    render('articles-list', 'o=-slug&page=3')
+
+
+def bench_list_page_native_rows():
+    render('native-articles-list')
+
+
+def bench_detail_page():
+    render('articles-details', pk=articles[0].pk)
+
+
+def bench_json_list():
+    render('tags-list-json')
+
+
+def bench_gen_short_props():
+    view = SectionDisplay()
+    for section in sections:
+        list(view.gen_short_props(section))
+
+
+def bench_display_value():
+    view = SectionDisplay()
+    display_value, item_info = view._display_value, view._item_info
+    for section in sections:
+        for field_info in item_info:
+            display_value(section, field_info)
+
+
+def bench_buttons():
+    for article in articles:
+        view = ButtonsView()
+        view.object = article
+        view.process_buttons(view.get_buttons())
+
+
+def bench_relative_url():
+    ctrl = ArticleController()
+    request = get_request('/articles/list/')
+    for _ in range(10):
+        bound = ctrl.bind(request, (), {})
+        for article in articles:
+            bound.relative_url('details/{}'.format(article.pk))
@@ -0,0 +1,41 @@
+"""
+Benchmarks of FormatMixin.format_value, the generic path used when the type of a value isn't known in
+advance, for each type of value.
+"""
+import datetime
+from decimal import Decimal
+
+from django.db import models
+from django_crud.rich_views import FormatMixin
+from tests.models import Event
+
+N = 200
+
+#: (name, values, field)
+VALUE_TYPES = [
+    ('str', ['text {}'.format(i) for i in range(N)], None),
+    ('int', [i * 1001 for i in range(N)], None),
+    ('float', [i * 1000.5 for i in range(N)], None),
+    ('decimal', [Decimal(i) / 7 for i in range(N)], None),
+    ('bool', [i % 2 == 0 for i in range(N)], None),
+    ('date', [datetime.date(2016, 1 + i % 12, 1 + i % 28) for i in range(N)], None),
+    ('datetime', [datetime.datetime(2016, 1, 1 + i % 28, i % 24, i % 60) for i in range(N)], None),
+    ('time', [datetime.time(i % 24, i % 60) for i in range(N)], None),
+    ('none', [None] * N, None),
+    ('list', [['a', 'b', i] for i in range(N)], None),
+    ('choices', [Event.KINDS[i % 2][0] for i in range(N)], Event._meta.get_field('kind')),
+    ('email', ['user{}@example.com'.format(i) for i in range(N)], models.EmailField()),
+]
+
+
+def _format_value_bench(values, field):
+    def bench():
+        # a new instance for each call as each request has a new view
+        format_value = FormatMixin().format_value
+        for value in values:
+            format_value(value, field)
+    return bench
+
+
+for _name, _values, _field in VALUE_TYPES:
+    globals()['bench_format_value_' + _name] = _format_value_bench(_values, _field)
@@ -0,0 +1,39 @@
+"""
+Benchmarks of list views of the example site's sport models.
+"""
+import datetime
+
+from demo.sport.models import Town, Team, Player
+from django_crud.controllers import RichController
+from .helpers import render
+
+
+class PlayerController(RichController):
+    model = Player
+    list_display_items = ['link|name', 'dob', 'player_type', 'teams']
+    list_filters = ['player_type', 'dob']
+
+
+def setup():
+    towns = [Town.objects.create(name='town {}'.format(i), population=i * 1000) for i in range(20)]
+    Team.objects.bulk_create(Team(name='team {}'.format(i), owner='owner {}'.format(i), home_town=towns[i % 20])
+                             for i in range(200))
+    teams = list(Team.objects.all())
+    types = [t for t, _ in Player.PLAYER_TYPES]
+    for i in range(400):
+        player = Player.objects.create(name='player {}'.format(i), player_type=types[i % 4],
+                                       dob=datetime.date(1980 + i % 20, 1 + i % 12, 1 + i % 28))
+        player.teams.add(teams[i % 200])
+
+
+def bench_team_list():
+    # the example TeamController has a home_town filter so this includes counting facets
+    render('teams-list')
+
+
+def bench_team_list_filtered():
+    render('teams-list', 'home_town=1')
+
+
+def bench_player_list_filtered():
+    render('players-list', 'player_type=md&dob__gte=1985-01-01&o=-dob')
@@ -0,0 +1,43 @@
+from django.core.handlers.base import BaseHandler
+from django.core.urlresolvers import reverse, resolve
+from django.test import RequestFactory
+
+_handler = None
+_resolved = {}
+
+
+def get_request(path='/'):
+    """
+    GET request for path with request middleware applied, as in tests.conftest.SimpleRequestFactory.
+    """
+    global _handler
+    if _handler is None:
+        _handler = BaseHandler()
+        _handler.load_middleware()
+    request = RequestFactory().get(path)
+    for middleware_method in _handler._request_middleware:
+        middleware_method(request)
+    return request
+
+
+def _resolve(view_name, kwargs):
+    key = view_name, tuple(sorted(kwargs.items()))
+    if key not in _resolved:
+        path = reverse(view_name, kwargs=kwargs)
+        _resolved[key] = path, resolve(path)
+    return _resolved[key]
+
+
+def render(view_name, query='', **kwargs):
+    """
+    Call the view named view_name in benchmarks.urls and render the response, benchmarks shouldn't time
+    error responses. urls are reversed and resolved once so only the view is timed.
+    """
+    path, match = _resolve(view_name, kwargs)
+    request = get_request(path + '?' + query if query else path)
+    response = match.func(request, *match.args, **match.kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+    if response.status_code != 200:
+        raise RuntimeError('{} returned status {}'.format(request.get_full_path(), response.status_code))
+    return response
@@ -0,0 +1,139 @@
+"""
+Run the microbenchmarks in benchmarks/bench_*.py against an in-memory SQLite database and compare them
+with a recorded baseline, exiting with status 1 if any is slower than the baseline by more than the threshold.
+
+    python -m benchmarks.run --save           # run and record a baseline
+    python -m benchmarks.run                  # run and compare with the baseline
+    python -m benchmarks.run list_page        # only run benchmarks whose names include "list_page"
+
+Timings depend on the machine and python version so the baseline (benchmarks/baseline.json by default) isn't
+committed: record one with --save on the machine the comparison will be made on, eg. before making changes,
+and record it again after upgrading python or dependencies. Benchmarks missing from the baseline are
+reported without being compared.
+
+Each bench_* module may define setup() to create its data, every function named bench_* is a benchmark.
+"""
+import argparse
+import glob
+import importlib
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+#: minimum duration of each round, fast benchmarks are called repeatedly to reach it
+MIN_ROUND_TIME = 0.05
+
+
+def setup_django():
+    sys.path[:0] = [ROOT_DIR, os.path.join(ROOT_DIR, 'example_site')]
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    import django
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def find_benchmarks(name_filter=None):
+    """
+    Import each bench_* module, call its setup function and find its benchmarks.
+    :return: list of (name, function) tuples
+    """
+    benchmarks = []
+    for path in sorted(glob.glob(os.path.join(BENCH_DIR, 'bench_*.py'))):
+        module_name = os.path.splitext(os.path.basename(path))[0]
+        module = importlib.import_module('benchmarks.' + module_name)
+        funcs = [(name, func) for name, func in sorted(vars(module).items())
+                 if name.startswith('bench_') and callable(func)]
+        funcs = [(module_name[6:] + '.' + name[6:], func) for name, func in funcs]
+        if name_filter:
+            funcs = [(name, func) for name, func in funcs if name_filter in name]
+        if funcs:
+            if hasattr(module, 'setup'):
+                module.setup()
+            benchmarks += funcs
+    return benchmarks
+
+
+def time_benchmark(func, rounds):
+    """
+    Time func, it's called number times per round where number is chosen so each round takes at least
+    MIN_ROUND_TIME.
+    :return: median time of one call in milliseconds
+    """
+    start = time.perf_counter()
+    func()
+    number = max(1, int(MIN_ROUND_TIME / max(time.perf_counter() - start, 1e-9)))
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+    return sorted(times)[len(times) // 2] * 1000
+
+
+def compare(results, baseline, threshold):
+    """
+    Print the results with the change from the baseline.
+    :return: names of benchmarks slower than the baseline by more than threshold
+    """
+    regressions = []
+    print('{:<40} {:>10} {:>10} {:>8}'.format('benchmark', 'ms', 'baseline', 'change'))
+    for name, ms in results.items():
+        base = baseline.get(name)
+        if base is None:
+            change = ''
+        else:
+            ratio = ms / base - 1
+            change = '{:+.0%}'.format(ratio)
+            if ratio > threshold:
+                regressions.append(name)
+                change += ' !'
+        print('{:<40} {:>10.3f} {:>10} {:>8}'.format(name, ms, '' if base is None else '{:.3f}'.format(base),
+                                                     change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run django-crud microbenchmarks')
+    parser.add_argument('filter', nargs='?', help='only run benchmarks whose names include this')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline json file')
+    parser.add_argument('--save', action='store_true', help='record the results as the baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='fail if a benchmark is this fraction slower than the baseline, default 0.25')
+    parser.add_argument('--rounds', type=int, default=7, help='rounds to time each benchmark for')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    results = {}
+    for name, func in find_benchmarks(args.filter):
+        results[name] = time_benchmark(func, args.rounds)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    elif not args.save:
+        print('no baseline found at {}, record one with --save'.format(args.baseline))
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.save:
+        baseline.update({name: round(ms, 4) for name, ms in results.items()})
+        with open(args.baseline, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': baseline}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print('baseline saved to {}'.format(args.baseline))
+    elif regressions:
+        print('{} benchmark(s) slower than the baseline by more than {:.0%}: {}'.format(
+            len(regressions), args.threshold, ', '.join(regressions)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
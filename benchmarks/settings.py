@@ -0,0 +1,17 @@
+from tests.settings import *  # noqa
+
+DEBUG = False
+ALLOWED_HOSTS = ['testserver']
+
+ROOT_URLCONF = 'benchmarks.urls'
+
+INSTALLED_APPS += ('demo.sport',)  # noqa
+
+TEMPLATES[0]['BACKEND'] = 'django_jinja.backend.Jinja2'  # noqa
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
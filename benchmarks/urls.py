@@ -0,0 +1,13 @@
+from django.conf.urls import include, url
+
+from demo.sport.views import TeamController
+from .bench_display import ArticleController, NativeArticleController, JsonTagController
+from .bench_sport import PlayerController
+
+urlpatterns = [
+    url(r'^articles/', include(ArticleController.as_views('articles'))),
+    url(r'^native-articles/', include(NativeArticleController.as_views('native-articles'))),
+    url(r'^tags/', include(JsonTagController.as_views('tags'))),
+    url(r'^teams/', include(TeamController.as_views('teams'))),
+    url(r'^players/', include(PlayerController.as_views('players'))),
+]
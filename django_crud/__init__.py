@@ -15,6 +15,8 @@ __author__ = 'Samuel Colvin'
 __license__ = 'MIT'
 __copyright__ = 'Copyright 2015 Samuel Colvin'
 
+default_app_config = 'django_crud.apps.CrudConfig'
+
 
 @register()
 def example_check(app_configs, **kwargs):
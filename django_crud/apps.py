@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class CrudConfig(AppConfig):
+    name = 'django_crud'
+    verbose_name = 'django-crud'
+
+    def ready(self):
+        from .row_cache import connect_signals, row_cache_enabled
+        if row_cache_enabled():
+            connect_signals()
@@ -1,23 +1,49 @@
+from calendar import timegm
 from functools import update_wrapper
 
+from django.http import StreamingHttpResponse, HttpResponseNotModified, HttpResponseBadRequest
 from django.shortcuts import redirect
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
+from django.utils.http import http_date, parse_http_date_safe, parse_etags, quote_etag
+from django.core.exceptions import ValidationError
+from django.views.generic import View, ListView, DetailView, CreateView, UpdateView, DeleteView, FormView
+from django.views.generic.detail import BaseDetailView
+from django.views.generic.list import BaseListView
 from django.utils.decorators import classonlymethod
 
+from .timing import server_timing_enabled, ServerTiming, TimedTemplateResponse
+
 
 class CtrlViewMixin:
+    #: durations of the phases of the request if settings.CRUD_SERVER_TIMING is set, see django_crud.timing
+    timing = None
+
     def __init__(self, ctrl):
         self.ctrl = ctrl
+        if server_timing_enabled():
+            self.timing = ServerTiming()
+            self.response_class = TimedTemplateResponse
         self.init_handler()
         super(CtrlViewMixin, self).__init__()
 
+    def dispatch(self, request, *args, **kwargs):
+        if self.timing is None:
+            return super(CtrlViewMixin, self).dispatch(request, *args, **kwargs)
+        try:
+            response = super(CtrlViewMixin, self).dispatch(request, *args, **kwargs)
+        except Exception:
+            self.timing.finish()
+            raise
+        response.timing = self.timing
+        return self.timing.complete(response, request, self)
+
     def init_handler(self):
         pass
 
     @classonlymethod
     def as_view(cls, ctrl, **initkwargs):
         """
-        unchanged from super method except for the 4 marked lines below
+        unchanged from super method except for the 4 marked lines below which bind a copy of the controller
+        to each request so requests in different threads don't share state.
         """
         for key in initkwargs:  # pragma: no cover
             if key in cls.http_method_names:
@@ -31,10 +57,10 @@ class CtrlViewMixin:
 
         def view(request, *args, **kwargs):
             # { changed
-            self = cls(ctrl, **initkwargs)
-            self.request = ctrl.request = request
-            self.args = ctrl.args = args
-            self.kwargs = ctrl.kwargs = kwargs
+            self = cls(ctrl.bind(request, args, kwargs), **initkwargs)
+            self.request = request
+            self.args = args
+            self.kwargs = kwargs
             # }
             if hasattr(self, 'get') and not hasattr(self, 'head'):
                 self.head = self.get
@@ -54,7 +80,58 @@ class CtrlViewMixin:
         return context
 
 
-class CtrlListView(CtrlViewMixin, ListView):
+class ConditionalGetMixin:
+    """
+    Answer conditional GET requests with "304 Not Modified" without rendering the page when the ETag or
+    Last-Modified validators match the request, the controller's cache headers are added to every response.
+
+    Validators are found by get_validators() which subclasses define to return a tuple of
+    (etag, last modified datetime), either can be None.
+    """
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        if last_modified is not None:
+            last_modified = timegm(last_modified.utctimetuple())
+        if self.not_modified(request, etag, last_modified):
+            response = HttpResponseNotModified()
+        else:
+            response = super(ConditionalGetMixin, self).get(request, *args, **kwargs)
+        if etag is not None:
+            response['ETag'] = quote_etag(etag)
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        self.ctrl.patch_response_headers(response)
+        return response
+
+    @staticmethod
+    def not_modified(request, etag, last_modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            # If-None-Match takes precedence over If-Modified-Since
+            etags = parse_etags(if_none_match)
+            return etag is not None and (etag in etags or '*' in etags)
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE'))
+        return last_modified is not None and if_modified_since is not None and last_modified <= if_modified_since
+
+
+class ListConditionalGetMixin(ConditionalGetMixin):
+    def get_validators(self):
+        return self.ctrl.get_list_validators(self.get_queryset())
+
+
+class DetailConditionalGetMixin(ConditionalGetMixin):
+    def get_validators(self):
+        self.object = self.get_object()
+        return self.ctrl.get_detail_validators(self.object)
+
+    def get_object(self, queryset=None):
+        # the object is already found by get_validators
+        if queryset is None and getattr(self, 'object', None) is not None:
+            return self.object
+        return super(DetailConditionalGetMixin, self).get_object(queryset)
+
+
+class CtrlListView(CtrlViewMixin, ListConditionalGetMixin, ListView):
     def init_handler(self):
         self.ctrl.list_view_init_handler(self)
 
@@ -65,7 +142,7 @@ class CtrlListView(CtrlViewMixin, ListView):
         return self.ctrl.relative_url('details/{}'.format(obj.pk))
 
 
-class CtrlDetailView(CtrlViewMixin, DetailView):
+class CtrlDetailView(CtrlViewMixin, DetailConditionalGetMixin, DetailView):
     def init_handler(self):
         self.ctrl.detail_view_init_handler(self)
 
@@ -104,3 +181,72 @@ class CtrlDeleteView(CtrlViewMixin, DeleteView):
 
     def get_queryset(self):
         return self.ctrl.get_queryset()
+
+
+class CtrlBulkView(CtrlViewMixin, View):
+    http_method_names = ['post']
+
+    def init_handler(self):
+        self.ctrl.bulk_view_init_handler(self)
+
+    def post(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        if not request.POST.get('select_all'):
+            try:
+                queryset = queryset.filter(pk__in=request.POST.getlist('pk'))
+            except (ValueError, TypeError):
+                return HttpResponseBadRequest('invalid primary key')
+        return self.ctrl.run_bulk_action(request.POST.get('action'), queryset)
+
+    def get_queryset(self):
+        return self.ctrl.get_queryset()
+
+
+class CtrlImportView(CtrlViewMixin, FormView):
+    """
+    Import the file uploaded with the form using import_csv(), see RichImportViewMixin.
+    """
+    def init_handler(self):
+        self.ctrl.import_view_init_handler(self)
+
+    def form_valid(self, form):
+        try:
+            result = self.import_csv(form.cleaned_data['file'])
+        except ValidationError as e:
+            form.add_error('file', e)
+            return self.form_invalid(form)
+        return self.render_to_response(self.get_context_data(form=self.get_form_class()(), result=result))
+
+
+class CtrlExportView(CtrlViewMixin, View):
+    """
+    Stream the content generated by gen_export(queryset), see RichExportViewMixin.
+    """
+    content_type = 'text/csv'
+
+    def init_handler(self):
+        self.ctrl.export_view_init_handler(self)
+
+    def get(self, request, *args, **kwargs):
+        response = StreamingHttpResponse(self.gen_export(self.get_queryset()), content_type=self.content_type)
+        response['Content-Disposition'] = 'attachment; filename="{}"'.format(self.ctrl.get_export_filename())
+        return response
+
+    def get_queryset(self):
+        return self.ctrl.get_queryset()
+
+
+class CtrlJsonListView(CtrlViewMixin, ListConditionalGetMixin, BaseListView):
+    def init_handler(self):
+        self.ctrl.json_list_view_init_handler(self)
+
+    def get_queryset(self):
+        return self.ctrl.get_queryset()
+
+
+class CtrlJsonDetailView(CtrlViewMixin, DetailConditionalGetMixin, BaseDetailView):
+    def init_handler(self):
+        self.ctrl.json_detail_view_init_handler(self)
+
+    def get_queryset(self):
+        return self.ctrl.get_queryset()
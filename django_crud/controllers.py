@@ -1,18 +1,30 @@
+import copy
+import hashlib
 import re
+from collections import OrderedDict
 
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.utils.functional import cached_property
 from django.contrib import messages
 from django.conf.urls import url, include
-from django.db.models import ProtectedError
+from django.db import transaction
+from django.db.models import ProtectedError, Count, Max
 from django.forms import modelform_factory, ModelForm
+from django.http import HttpResponseBadRequest
 from django.shortcuts import redirect
+from django.utils import timezone
 from django.utils.decorators import classonlymethod
-from django.utils.translation import ugettext_lazy as _
+from django.utils.translation import ugettext_lazy as _, get_language
 
 from .rich_views import (RichListViewMixin, RichDetailViewMixin, RichCreateViewMixin, RichUpdateViewMixin,
-                         RichDeleteViewMixin)
-from .base_views import CtrlListView, CtrlDetailView, CtrlCreateView, CtrlUpdateView, CtrlDeleteView
-from django_crud.forms import RichCrudForm
+                         RichDeleteViewMixin, RichExportViewMixin, RichImportViewMixin, RichBulkViewMixin,
+                         JsonListViewMixin, JsonDetailViewMixin)
+from .base_views import (CtrlListView, CtrlDetailView, CtrlCreateView, CtrlUpdateView, CtrlDeleteView,
+                         CtrlExportView, CtrlJsonListView, CtrlJsonDetailView, CtrlBulkView, CtrlImportView)
+from .exceptions import SetupCrudError
+from .pagination import update_counter
+from .row_cache import invalidate_rows
+from django_crud.forms import RichCrudForm, ImportForm
 
 
 class VanillaController:
@@ -35,9 +47,36 @@ class VanillaController:
     update_url = r'update/(?P<pk>\d+)/$'
     delete_url = r'delete/(?P<pk>\d+)/$'
 
+    #: whether to add "list.json" and "details/<pk>.json" urls giving the list and details as JSON
+    json_api = False
+    json_list_url = r'list\.json$'
+    json_detail_url = r'details/(?P<pk>\d+)\.json$'
+
+    #: DateTimeField updated whenever an object changes eg. with auto_now, if set list and detail views answer
+    #: conditional GET requests with "304 Not Modified" using ETag and Last-Modified headers
+    last_modified_field = None
+    #: arguments to django.utils.cache.patch_cache_control for list and detail views eg. {'private': True}
+    cache_control = {}
+    #: headers to add to the Vary header of list and detail views eg. ['Cookie']
+    vary_headers = []
+
+    #: names of url attributes, the end of the current url is replaced by relative_url if it matches any of them
+    crud_url_attrs = ['list_url', 'detail_url', 'create_url', 'update_url', 'delete_url']
+
     def __init__(self):
         self.request = self.args = self.kwargs = None
 
+    def bind(self, request, args, kwargs):
+        """
+        Return a shallow copy of the controller holding the state of one request, the instance created by
+        as_views is shared between requests (and threads) so it's never changed.
+        """
+        # compute cached properties once on the shared instance so copies inherit them
+        self.crud_url_patterns
+        ctrl = copy.copy(self)
+        ctrl.request, ctrl.args, ctrl.kwargs = request, args, kwargs
+        return ctrl
+
     def get_queryset(self):
         return self.model.objects.all()
 
@@ -82,6 +121,7 @@ class VanillaController:
 
     def create_form_valid(self, view, form):
         view.object = form.save()
+        self.objects_changed(created=1)
         return redirect(self.get_create_success_url())
 
     @property
@@ -133,6 +173,15 @@ class VanillaController:
             object.delete()
         except ProtectedError:
             messages.error(self.request, _('Sorry, this object is in use so it cannot be deleted.'))
+        else:
+            self.objects_changed(deleted=1)
+
+    def objects_changed(self, created=0, deleted=0):
+        """
+        Called after the controller creates or deletes objects, updates the count used by the "counter"
+        count strategy.
+        """
+        update_counter(self.model, created - deleted)
 
     def delete_view_init_handler(self, view_cls):
         pass
@@ -144,9 +193,83 @@ class VanillaController:
             modal_template_name = self.modal_edit_template_name  # TODO
         return TmpDeleteView.as_view(self)
 
+    def get_list_validators(self, queryset):
+        """
+        Find validators for conditional GET requests to the list view from the latest last_modified_field and
+        the number of objects (so deletions are seen). Override to use other validators.
+        :param queryset: queryset of the list view
+        :return: tuple of (etag, last modified datetime), either can be None
+        """
+        if not self.last_modified_field:
+            return None, None
+        agg = queryset.order_by().aggregate(last_modified=Max(self.last_modified_field), count=Count('pk'))
+        return self.get_etag(agg['last_modified'], agg['count']), agg['last_modified']
+
+    def get_detail_validators(self, obj):
+        """
+        Find validators for conditional GET requests to the detail view from obj's last_modified_field.
+        :return: tuple of (etag, last modified datetime), either can be None
+        """
+        if not self.last_modified_field:
+            return None, None
+        last_modified = getattr(obj, self.last_modified_field)
+        return self.get_etag(obj.pk, last_modified), last_modified
+
+    def get_etag(self, *parts):
+        """
+        Generate an ETag from parts, the same data is displayed differently at different urls and for different
+        languages and users so they're included.
+        """
+        user = getattr(self.request, 'user', None)
+        parts += (self.request.get_full_path(), get_language(), getattr(user, 'pk', None))
+        return hashlib.md5(repr(parts).encode()).hexdigest()
+
+    def patch_response_headers(self, response):
+        if self.cache_control:
+            patch_cache_control(response, **self.cache_control)
+        if self.vary_headers:
+            patch_vary_headers(response, self.vary_headers)
+
     def get_list_url(self, list_view, name_prefix):
         return url(r'list/$', list_view, name='%s-list' % name_prefix)
 
+    @property
+    def json_list_view_parents(self):
+        return JsonListViewMixin, CtrlJsonListView
+
+    def json_list_view_init_handler(self, view_cls):
+        pass
+
+    def json_list_view(self):
+        class TmpJsonListView(*self.json_list_view_parents):
+            model = self.model
+        return TmpJsonListView.as_view(self)
+
+    @property
+    def json_detail_view_parents(self):
+        return JsonDetailViewMixin, CtrlJsonDetailView
+
+    def json_detail_view_init_handler(self, view_cls):
+        pass
+
+    def json_detail_view(self):
+        class TmpJsonDetailView(*self.json_detail_view_parents):
+            model = self.model
+        return TmpJsonDetailView.as_view(self)
+
+    def get_extra_urls(self, name_prefix):
+        """
+        Override to add more urls to those created by as_views.
+        :return: list of url patterns
+        """
+        urls = []
+        if self.json_api:
+            urls += [
+                url(self.json_list_url, self.json_list_view(), name='%s-list-json' % name_prefix),
+                url(self.json_detail_url, self.json_detail_view(), name='%s-details-json' % name_prefix),
+            ]
+        return urls
+
     @classonlymethod
     def as_views(cls, name_prefix):
         ctrl = cls()
@@ -167,21 +290,32 @@ class VanillaController:
         if ctrl.delete_view:
             url_patterns.append(url(cls.delete_url, ctrl.delete_view(), name='%s-delete' % name_prefix))
 
+        url_patterns += ctrl.get_extra_urls(name_prefix)
         return include(url_patterns)
 
     @cached_property
     def crud_url_patterns(self):
         urls = []
-        for url_attr in ['list_url', 'detail_url', 'create_url', 'update_url', 'delete_url']:
+        for url_attr in self.crud_url_attrs:
             url = getattr(self, url_attr).strip('$/')
             url = re.sub(r'\?P<\w*?>', '', url)
             url = re.sub(r'[\(\)]', '', url)
             urls.append(url)
         return '/({})/$'.format('|'.join(urls))
 
+    @cached_property
+    def url_prefix(self):
+        """
+        The current url up to the part matched by crud_url_patterns, found once per request; None if the url
+        doesn't match.
+        """
+        match = re.search(self.crud_url_patterns, self.request.path)
+        return match and self.request.path[:match.start()]
+
     def relative_url(self, rel_url):
-        new_url_ending = '/%s/' % rel_url.strip('/')
-        return re.sub(self.crud_url_patterns, new_url_ending, self.request.path)
+        if self.url_prefix is None:
+            return self.request.path
+        return '{}/{}/'.format(self.url_prefix, rel_url.strip('/'))
 
 
 # noinspection PyMethodMayBeStatic
@@ -196,6 +330,67 @@ class RichController(VanillaController):
     list_display_items = []
     detail_display_items = []
 
+    #: pagination mode for the list view, "offset" or "keyset", see ItemDisplayMixin.pagination
+    pagination = 'offset'
+
+    #: how to count items in the list view, see ItemDisplayMixin.count_strategy
+    count_strategy = 'exact'
+
+    #: display items the list view can be sorted by, see ItemDisplayMixin.sortable_items
+    sortable_items = None
+
+    #: fields searched by the list view's search form, see django_crud.search.create_search_index to index them
+    search_fields = []
+
+    #: filters shown in a panel on the list view, see ItemDisplayMixin.list_filters
+    list_filters = []
+    facet_cache_timeout = None
+
+    #: whether to render the rows of the list view's table in python, see RichListViewMixin.native_rows
+    native_rows = False
+
+    #: whether to cache rendered rows of the list view, see ItemDisplayMixin.row_cache
+    row_cache = False
+    row_cache_timeout = 300
+    row_version_field = None
+
+    #: whether to add an "export/" url which streams list_display_items for all objects as CSV,
+    #: add 'func|export_button' to list_view_buttons to link to it
+    csv_export = False
+    export_url = r'export/$'
+    export_chunk_size = 2000
+
+    #: actions which can be applied to rows selected on the list view, each action is either:
+    #: * "delete" to delete the selected objects
+    #: * a dict {'name': ..., 'text': ..., 'update': {<field name>: <value>, ...}} to set fields
+    #: * "func|<method name>" for a method of the controller taking a queryset of the selected objects,
+    #:   its short_description is the action's text
+    #: deletes and updates are performed in batches of bulk_batch_size objects inside one transaction
+    bulk_actions = []
+    bulk_url = r'bulk/$'
+    bulk_batch_size = 500
+
+    #: whether to add an "import/" url which creates objects from the rows of an uploaded CSV file,
+    #: add 'func|import_button' to list_view_buttons to link to it
+    csv_import = False
+    import_url = r'import/$'
+    import_template_name = 'crud/import.jinja'
+    import_batch_size = 1000
+    #: how imported rows are validated, "form" or "fields", see RichImportViewMixin.validation
+    import_validation = 'form'
+
+    crud_url_attrs = VanillaController.crud_url_attrs + ['export_url', 'bulk_url', 'import_url']
+
+    #: lookups for select_related and prefetch_related on list and detail views,
+    #: None to find them from display items
+    select_related = None
+    prefetch_related = None
+
+    #: whether to restrict list and detail querysets to the columns required by display items,
+    #: extra_columns lists any other fields required eg. by "func|" items
+    prune_columns = False
+    extra_columns = []
+
     detail_view_buttons = [
         'func|update_item_button',
         'func|delete_item_button',
@@ -204,6 +399,18 @@ class RichController(VanillaController):
     def list_view_init_handler(self, view_cls):
         view_cls.buttons = self.list_view_buttons
         view_cls.display_items = self.list_display_items
+        view_cls.pagination = self.pagination
+        view_cls.count_strategy = self.count_strategy
+        view_cls.search_fields = self.search_fields
+        view_cls.sortable_items = self.sortable_items
+        view_cls.list_filters = self.list_filters
+        view_cls.facet_cache_timeout = self.facet_cache_timeout
+        view_cls.native_rows = self.native_rows
+        view_cls.row_cache = self.row_cache
+        view_cls.row_cache_timeout = self.row_cache_timeout
+        view_cls.row_version_field = self.row_version_field
+        view_cls.bulk_actions = [(name, text) for name, (text, func) in self.get_bulk_actions().items()]
+        self.display_view_init_handler(view_cls)
 
     @property
     def list_view_parents(self):
@@ -216,6 +423,16 @@ class RichController(VanillaController):
     def detail_view_init_handler(self, view_cls):
         view_cls.buttons = self.detail_view_buttons
         view_cls.display_items = self.detail_display_items
+        self.display_view_init_handler(view_cls)
+
+    def display_view_init_handler(self, view_cls):
+        """
+        Set attributes common to list and detail views.
+        """
+        view_cls.select_related = self.select_related
+        view_cls.prefetch_related = self.prefetch_related
+        view_cls.prune_columns = self.prune_columns
+        view_cls.extra_columns = self.extra_columns
 
     @property
     def form_parents(self):
@@ -247,3 +464,150 @@ class RichController(VanillaController):
         if self.delete_view:
             return self.relative_url('delete/{pk}'.format(**self.kwargs))
     delete_item_button.short_description = _('Delete {verbose_name}')
+
+    def json_list_view_init_handler(self, view_cls):
+        self.list_view_init_handler(view_cls)
+
+    def json_detail_view_init_handler(self, view_cls):
+        self.detail_view_init_handler(view_cls)
+
+    def get_extra_urls(self, name_prefix):
+        urls = super(RichController, self).get_extra_urls(name_prefix)
+        if self.csv_export:
+            urls.append(url(self.export_url, self.export_view(), name='%s-export' % name_prefix))
+        if self.bulk_actions:
+            urls.append(url(self.bulk_url, self.bulk_view(), name='%s-bulk' % name_prefix))
+        if self.csv_import:
+            urls.append(url(self.import_url, self.import_view(), name='%s-import' % name_prefix))
+        return urls
+
+    @property
+    def export_view_parents(self):
+        return RichExportViewMixin, CtrlExportView
+
+    def export_view_init_handler(self, view_cls):
+        view_cls.display_items = self.list_display_items
+        view_cls.chunk_size = self.export_chunk_size
+        view_cls.search_fields = self.search_fields
+        view_cls.sortable_items = self.sortable_items
+        view_cls.list_filters = self.list_filters
+        self.display_view_init_handler(view_cls)
+
+    def export_view(self):
+        class TmpExportView(*self.export_view_parents):
+            model = self.model
+        return TmpExportView.as_view(self)
+
+    def get_export_filename(self):
+        return '{}.csv'.format(self.model._meta.verbose_name_plural)
+
+    def export_button(self):
+        if self.csv_export:
+            return self.relative_url('export')
+    export_button.short_description = _('Export {verbose_name_plural}')
+
+    @property
+    def import_view_parents(self):
+        return RichImportViewMixin, CtrlImportView
+
+    def import_view_init_handler(self, view_cls):
+        view_cls.batch_size = self.import_batch_size
+        view_cls.validation = self.import_validation
+
+    def import_view(self):
+        class TmpImportView(*self.import_view_parents):
+            model = self.model
+            form_class = ImportForm
+            template_name = self.import_template_name
+        return TmpImportView.as_view(self)
+
+    def import_button(self):
+        if self.csv_import:
+            return self.relative_url('import')
+    import_button.short_description = _('Import {verbose_name_plural}')
+
+    @property
+    def bulk_view_parents(self):
+        return RichBulkViewMixin, CtrlBulkView
+
+    def bulk_view_init_handler(self, view_cls):
+        view_cls.search_fields = self.search_fields
+        view_cls.list_filters = self.list_filters
+
+    def bulk_view(self):
+        class TmpBulkView(*self.bulk_view_parents):
+            model = self.model
+        return TmpBulkView.as_view(self)
+
+    def get_bulk_actions(self):
+        """
+        Find the bulk actions declared in bulk_actions.
+        :return: OrderedDict of {name: (text, function taking a queryset of the selected objects)}
+        """
+        actions = OrderedDict()
+        label_ctx = dict(verbose_name_plural=self.model._meta.verbose_name_plural)
+        for action in self.bulk_actions:
+            if action == 'delete':
+                actions['delete'] = _('Delete selected {verbose_name_plural}').format(**label_ctx), self.bulk_delete
+            elif isinstance(action, dict):
+                def update(queryset, values=action['update']):
+                    self.bulk_update(queryset, values)
+                actions[action['name']] = action['text'], update
+            elif isinstance(action, str) and action.startswith('func|'):
+                func = getattr(self, action[5:])
+                actions[action[5:]] = func.short_description.format(**label_ctx), func
+            else:
+                raise SetupCrudError('invalid bulk action: {!r}'.format(action))
+        return actions
+
+    def run_bulk_action(self, name, queryset):
+        """
+        Run the bulk action name on queryset inside a transaction, if it tries to delete protected objects
+        none of its changes are kept.
+        """
+        actions = self.get_bulk_actions()
+        if name not in actions:
+            return HttpResponseBadRequest('unknown action')
+        text, func = actions[name]
+        try:
+            with transaction.atomic():
+                func(queryset)
+        except ProtectedError:
+            messages.error(self.request, _('Sorry, some of these objects are in use so they cannot be deleted.'))
+        return redirect(self.get_bulk_success_url())
+
+    def get_bulk_success_url(self):
+        return self.relative_url('list')
+
+    def _batches(self, queryset):
+        pks = list(queryset.order_by().values_list('pk', flat=True))
+        return [pks[i:i + self.bulk_batch_size] for i in range(0, len(pks), self.bulk_batch_size)]
+
+    def bulk_delete(self, queryset):
+        """
+        Delete the objects in queryset, if any are protected ProtectedError is raised and none are deleted.
+        """
+        batches = self._batches(queryset)
+        with transaction.atomic():
+            for batch in batches:
+                self.model._default_manager.filter(pk__in=batch).delete()
+        deleted = sum(len(batch) for batch in batches)
+        self.objects_changed(deleted=deleted)
+        messages.success(self.request, _('{count} {verbose_name_plural} deleted').format(
+            count=deleted, verbose_name_plural=self.model._meta.verbose_name_plural))
+
+    def bulk_update(self, queryset, values):
+        """
+        Set fields of the objects in queryset, last_modified_field is also set if it's not in values.
+        """
+        values = dict(values)
+        if self.last_modified_field and self.last_modified_field not in values:
+            values[self.last_modified_field] = timezone.now()
+        batches = self._batches(queryset)
+        with transaction.atomic():
+            for batch in batches:
+                self.model._default_manager.filter(pk__in=batch).update(**values)
+        # update() doesn't send signals
+        invalidate_rows(self.model, [pk for batch in batches for pk in batch])
+        messages.success(self.request, _('{count} {verbose_name_plural} updated').format(
+            count=sum(len(batch) for batch in batches), verbose_name_plural=self.model._meta.verbose_name_plural))
@@ -0,0 +1,258 @@
+import copy
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models import Count
+from django.db.models.sql.datastructures import EmptyResultSet
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+
+from .exceptions import SetupCrudError
+from .pagination import _query_key
+
+
+def resolve_field(model, lookup):
+    """
+    Find the field a lookup like "team__home_town" refers to.
+    """
+    meta, field = model._meta, None
+    for part in lookup.split('__'):
+        if field is not None:
+            if not field.rel:
+                raise SetupCrudError('"{}" is not a field lookup of {}'.format(lookup, model.__name__))
+            meta = field.rel.to._meta
+        field = meta.get_field(part)
+    return field
+
+
+class ListFilter:
+    """
+    Filter a list by the value of a field given by the GET parameter named after the filter's lookup.
+
+    Filters which have options find the number of objects with each value ("facet counts") with one grouped
+    query, see count_values.
+    """
+    #: whether the filter panel shows options with counts or a range of values
+    has_options = True
+
+    def __init__(self, lookup, verbose_name=None):
+        self.lookup = lookup
+        self.verbose_name = verbose_name
+        self.field = None
+
+    def bind(self, model):
+        """
+        return a copy of the filter with the field it filters on found from model.
+        """
+        list_filter = copy.copy(self)
+        list_filter.field = resolve_field(model, self.lookup)
+        list_filter.verbose_name = self.verbose_name or list_filter.field.verbose_name
+        return list_filter
+
+    @property
+    def params(self):
+        return [self.lookup]
+
+    @property
+    def value_field(self):
+        """
+        field used to convert GET parameters to values
+        """
+        return self.field
+
+    def get_value(self, query_dict):
+        """
+        Find the value to filter by from GET parameters, invalid values are ignored.
+        :return: value or None if the list isn't filtered
+        """
+        value = query_dict.get(self.lookup)
+        if value in (None, ''):
+            return None
+        try:
+            return self.value_field.to_python(value)
+        except ValidationError:
+            return None
+
+    def filter(self, queryset, value):
+        return queryset.filter(**{self.lookup: value})
+
+    def count_values(self, queryset):
+        """
+        Count the objects with each value of the field in one "GROUP BY" query.
+        :return: list of rows (value, count)
+        """
+        return list(queryset.order_by().values_list(self.lookup).annotate(count=Count('pk')))
+
+    def get_options(self, rows):
+        """
+        Override to give the filter panel options, the base filter has none.
+        :param rows: result of count_values
+        :return: list of (value, label) tuples for the filter panel
+        """
+        return []
+
+    def facet(self, value, rows, query_dict):
+        """
+        Data for the filter panel.
+        :param value: the value currently filtered by or None
+        :param rows: result of count_values
+        :param query_dict: GET parameters without pagination, used to build links
+        :return: dict with keys: name, lookup, value and options, a list of dicts with keys:
+          label, count, url and selected
+        """
+        counts = {row[0]: row[-1] for row in rows}
+        options = []
+        for option_value, label in self.get_options(rows):
+            args = query_dict.copy()
+            selected = option_value == value
+            if selected:
+                args.pop(self.lookup, None)
+            else:
+                args[self.lookup] = option_value
+            options.append({
+                'label': label,
+                'count': counts.get(option_value, 0),
+                'url': '?' + args.urlencode(),
+                'selected': selected,
+            })
+        return {'name': self.verbose_name, 'lookup': self.lookup, 'value': value, 'options': options}
+
+
+class ChoicesFilter(ListFilter):
+    """
+    Filter by a field with choices, every choice is an option.
+    """
+    def get_options(self, rows):
+        return list(self.field.flatchoices)
+
+
+class ForeignKeyFilter(ListFilter):
+    """
+    Filter by a foreign key, related objects with at least one object in the list are options.
+
+    Labels are the related objects' str() which requires them to be fetched, if label_field is set the labels
+    are instead found with the counts.
+    """
+    def __init__(self, lookup, verbose_name=None, label_field=None):
+        super(ForeignKeyFilter, self).__init__(lookup, verbose_name)
+        self.label_field = label_field
+
+    @property
+    def value_field(self):
+        return self.field.rel.get_related_field()
+
+    def count_values(self, queryset):
+        """
+        :return: list of rows (pk, count) or (pk, label, count) if label_field is set
+        """
+        if not self.label_field:
+            return super(ForeignKeyFilter, self).count_values(queryset)
+        qs = queryset.order_by().values_list(self.lookup, '{}__{}'.format(self.lookup, self.label_field))
+        return list(qs.annotate(count=Count('pk')))
+
+    def get_options(self, rows):
+        pks = [row[0] for row in rows if row[0] is not None]
+        if self.label_field:
+            labels = {row[0]: row[1] for row in rows}
+        else:
+            labels = {pk: str(obj) for pk, obj in self.field.rel.to._default_manager.in_bulk(pks).items()}
+        return sorted(((pk, labels[pk]) for pk in pks if pk in labels), key=lambda option: str(option[1]))
+
+
+class BooleanFilter(ListFilter):
+    """
+    Filter by a boolean field with "yes" and "no" options.
+    """
+    def get_options(self, rows):
+        return [(True, _('Yes')), (False, _('No'))]
+
+
+class DateRangeFilter(ListFilter):
+    """
+    Filter by a date or datetime field being between two dates (inclusive) given by the GET parameters
+    "<lookup>__gte" and "<lookup>__lte", either may be omitted. There are no options or counts.
+    """
+    has_options = False
+
+    @property
+    def params(self):
+        return [self.lookup + '__gte', self.lookup + '__lte']
+
+    def get_value(self, query_dict):
+        dates = []
+        for param in self.params:
+            try:
+                dates.append(models.DateField().to_python(query_dict.get(param) or None))
+            except ValidationError:
+                dates.append(None)
+        return tuple(dates) if any(dates) else None
+
+    def _as_field_value(self, date):
+        if not isinstance(self.field, models.DateTimeField):
+            return date
+        value = datetime.datetime.combine(date, datetime.time.min)
+        return timezone.make_aware(value) if settings.USE_TZ else value
+
+    def filter(self, queryset, value):
+        start, end = value
+        if start:
+            queryset = queryset.filter(**{self.lookup + '__gte': self._as_field_value(start)})
+        if end:
+            # objects on the end date are included
+            end = self._as_field_value(end + datetime.timedelta(days=1))
+            queryset = queryset.filter(**{self.lookup + '__lt': end})
+        return queryset
+
+    def count_values(self, queryset):
+        return None
+
+    def facet(self, value, rows, query_dict):
+        args = query_dict.copy()
+        for param in self.params:
+            args.pop(param, None)
+        start, end = value or (None, None)
+        return {'name': self.verbose_name, 'lookup': self.lookup, 'value': value, 'options': None,
+                'start': start, 'end': end, 'params': self.params, 'other_args': list(args.lists())}
+
+
+def get_list_filter(model, item):
+    """
+    Create a filter for model from an item of list_filters, either a ListFilter or a field lookup in which case
+    the type of filter is chosen from the field.
+    """
+    if isinstance(item, ListFilter):
+        return item.bind(model)
+    field = resolve_field(model, item)
+    if field.choices:
+        filter_cls = ChoicesFilter
+    elif field.rel and not field.many_to_many:
+        filter_cls = ForeignKeyFilter
+    elif isinstance(field, (models.BooleanField, models.NullBooleanField)):
+        filter_cls = BooleanFilter
+    elif isinstance(field, models.DateField):
+        filter_cls = DateRangeFilter
+    else:
+        raise SetupCrudError('no filter for "{}", a {}, list_filters may include fields with choices, foreign keys, '
+                             'booleans and dates'.format(item, field.__class__.__name__))
+    return filter_cls(item).bind(model)
+
+
+def count_facet_values(list_filter, queryset, cache_timeout=None):
+    """
+    Call list_filter.count_values, if cache_timeout is not None the result is cached for that many seconds,
+    the key includes the query so each combination of other filters and search is cached separately.
+    """
+    if not list_filter.has_options or cache_timeout is None:
+        return list_filter.count_values(queryset)
+    try:
+        key = _query_key('crud-facet:' + list_filter.lookup, queryset.order_by())
+    except EmptyResultSet:
+        return []
+    rows = cache.get(key)
+    if rows is None:
+        rows = list_filter.count_values(queryset)
+        cache.set(key, rows, cache_timeout)
+    return rows
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+
+from django.utils import dateformat, numberformat
+from django.utils.formats import get_format
+
+
+class LRUCache:
+    """
+    Minimal least recently used cache, once it holds "size" items the least recently used item is dropped
+    as each new one is added.
+    """
+    def __init__(self, size):
+        self.size = size
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        try:
+            value = self._data[key]
+        except KeyError:
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.size:
+            self._data.popitem(last=False)
+
+
+class LocaleFormatter:
+    """
+    Format numbers, dates and times for one language, equivalent to django.utils.formats.number_format,
+    date_format and time_format but with the formats looked up once when the formatter is created and
+    formatted values remembered.
+
+    Values are remembered by their type and repr, not equality, since equal values can be formatted
+    differently: eg. Decimal('1.5') and Decimal('1.50') or datetimes with different time zones.
+    """
+    def __init__(self, lang, cache_size=512):
+        self.lang = lang
+        self.decimal_separator = get_format('DECIMAL_SEPARATOR', lang)
+        self.number_grouping = get_format('NUMBER_GROUPING', lang)
+        self.thousand_separator = get_format('THOUSAND_SEPARATOR', lang)
+        self.datetime_format = get_format('DATETIME_FORMAT', lang)
+        self.date_format = get_format('DATE_FORMAT', lang)
+        self.time_format = get_format('TIME_FORMAT', lang)
+        self._cache = LRUCache(cache_size)
+
+    def _format(self, kind, value):
+        key = kind, value.__class__, repr(value)
+        result = self._cache.get(key)
+        if result is None:
+            if kind == 'number':
+                result = numberformat.format(value, self.decimal_separator, grouping=self.number_grouping,
+                                             thousand_sep=self.thousand_separator)
+            elif kind == 'time':
+                result = dateformat.time_format(value, self.time_format)
+            else:
+                result = dateformat.format(value, getattr(self, kind + '_format'))
+            self._cache.set(key, result)
+        return result
+
+    def number(self, value):
+        return self._format('number', value)
+
+    def datetime(self, value):
+        return self._format('datetime', value)
+
+    def date(self, value):
+        return self._format('date', value)
+
+    def time(self, value):
+        return self._format('time', value)
@@ -1,4 +1,5 @@
 from django import forms
+from django.utils.translation import ugettext_lazy as _
 
 
 class RichCrudForm(forms.ModelForm):
@@ -6,3 +7,11 @@ class RichCrudForm(forms.ModelForm):
         css = {
             'all': ('crud/forms.css',)
         }
+
+
+class ImportForm(forms.Form):
+    file = forms.FileField(label=_('CSV file'))
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label=_('Search'), required=False)
@@ -0,0 +1,103 @@
+import os
+import re
+import tempfile
+
+from django.template import engines
+from jinja2 import Environment, FileSystemBytecodeCache
+from jinja2.ext import Extension
+
+#: prefix of templates trimmed by TrimWhitespaceExtension and compiled by precompile_templates
+CRUD_TEMPLATE_PREFIX = 'crud/'
+
+
+class AtomicFileSystemBytecodeCache(FileSystemBytecodeCache):
+    """
+    FileSystemBytecodeCache which writes each file to a temporary file then renames it, so processes sharing
+    the directory never load partially written bytecode.
+    """
+    def dump_bytecode(self, bucket):
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                bucket.write_bytecode(f)
+            os.replace(tmp_path, self._get_cache_filename(bucket))
+        except OSError:
+            # the cache is an optimisation, failing to write it shouldn't fail the request
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def crud_bytecode_cache(directory=None):
+    """
+    Create a bytecode cache for the "bytecode_cache" option of the django-jinja backend.
+    :param directory: where to store compiled templates, defaults to settings.CRUD_JINJA_CACHE_DIR or a
+      private directory in the system's temporary directory; it should be shared by all workers.
+
+    Bytecode is only reused for unchanged template sources so the cache doesn't need clearing when
+    templates change, it should however be cleared if the extensions used change. Eg. in settings.py:
+
+        from django_jinja.builtins import DEFAULT_EXTENSIONS
+        from django_crud.jinja import crud_bytecode_cache
+
+        TEMPLATES = [{
+            'BACKEND': 'django_jinja.backend.Jinja2',
+            'OPTIONS': {
+                ...
+                'bytecode_cache': crud_bytecode_cache(),
+                'extensions': DEFAULT_EXTENSIONS + ['django_crud.jinja.TrimWhitespaceExtension'],
+            },
+        }]
+    """
+    if directory is None:
+        from django.conf import settings
+        directory = getattr(settings, 'CRUD_JINJA_CACHE_DIR', None)
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+    return AtomicFileSystemBytecodeCache(directory, pattern='crud_jinja_%s.cache')
+
+
+class TrimWhitespaceExtension(Extension):
+    """
+    Remove the indentation of each line from templates whose names start with CRUD_TEMPLATE_PREFIX (or any
+    template if trim_all_templates is set on the environment) before they're compiled, so the indentation
+    isn't sent with every cell of a table.
+
+    Line breaks are kept so whitespace between inline elements and line numbers in errors are unchanged,
+    templates shouldn't contain <pre> or <textarea> elements with literal indentation.
+    """
+    def __init__(self, environment):
+        super(TrimWhitespaceExtension, self).__init__(environment)
+        environment.extend(trim_all_templates=False)
+
+    def preprocess(self, source, name, filename=None):
+        if not self.environment.trim_all_templates and not (name or '').startswith(CRUD_TEMPLATE_PREFIX):
+            return source
+        return trim_whitespace(source)
+
+
+def trim_whitespace(source):
+    return re.sub(r'^[ \t]+', '', source, flags=re.M)
+
+
+def get_jinja_environments():
+    """
+    Find the jinja environments of template engines, eg. those using django-jinja's backend.
+    """
+    return [engine.env for engine in engines.all() if isinstance(getattr(engine, 'env', None), Environment)]
+
+
+def precompile_templates(prefix=CRUD_TEMPLATE_PREFIX, environments=None):
+    """
+    Compile templates whose names start with prefix (all templates if prefix is None) so the first requests
+    after a deploy don't have to, compiled templates are written to the bytecode cache if one is configured.
+
+    Call this when workers start, eg. in wsgi.py after get_wsgi_application() or in AppConfig.ready().
+    :return: list of the names of the templates compiled
+    """
+    names = []
+    for env in environments or get_jinja_environments():
+        for name in env.list_templates(filter_func=lambda n: prefix is None or n.startswith(prefix)):
+            env.get_template(name)
+            names.append(name)
+    return names
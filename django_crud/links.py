@@ -0,0 +1,65 @@
+from django.core.signals import setting_changed
+from django.core.urlresolvers import reverse, NoReverseMatch, get_script_prefix, get_urlconf
+from django.utils.translation import get_language
+
+from .exceptions import ReverseCrudError
+
+#: primary key reversed to find the template of urls taking a primary key, it's replaced by each object's pk
+SENTINEL_PK = 918273645
+
+#: view name and reverse context -> url if the view takes no arguments, (start, end) of the url around the pk
+#: or False if the url can't be reversed with an integer pk
+_url_templates = {}
+
+
+def _template_key(view_name):
+    return view_name, get_urlconf(), get_script_prefix(), get_language()
+
+
+def _find_template(view_name):
+    try:
+        return reverse(view_name)
+    except NoReverseMatch:
+        pass
+    try:
+        url = reverse(view_name, args=(SENTINEL_PK,))
+    except NoReverseMatch:
+        return False
+    if url.count(str(SENTINEL_PK)) != 1:
+        return False
+    return tuple(url.split(str(SENTINEL_PK)))
+
+
+def reverse_object_url(view_name, obj=None):
+    """
+    Equivalent to reversing view_name without arguments or if that fails with the primary key of obj, the
+    reversed url (or the url around the primary key) is remembered for each view name so later calls
+    don't call reverse.
+
+    Views whose urls can't be reversed with an integer primary key (eg. slugs or uuids) are remembered as
+    such and reversed with each object's primary key on each call.
+    """
+    key = _template_key(view_name)
+    template = _url_templates.get(key)
+    if template is None:
+        template = _url_templates[key] = _find_template(view_name)
+
+    if isinstance(template, str):
+        return template
+    pk = getattr(obj, 'pk', None)
+    if pk is None:
+        raise ReverseCrudError('No reverse found for "{}"'.format(view_name))
+    if template and isinstance(pk, int):
+        return template[0] + str(pk) + template[1]
+    try:
+        return reverse(view_name, args=(pk,))
+    except NoReverseMatch:
+        raise ReverseCrudError('No reverse found for "{}"'.format(view_name))
+
+
+def _clear_url_templates(setting, **kwargs):
+    if setting == 'ROOT_URLCONF':
+        _url_templates.clear()
+
+
+setting_changed.connect(_clear_url_templates)
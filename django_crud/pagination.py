@@ -0,0 +1,357 @@
+import base64
+import binascii
+import datetime
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.paginator import InvalidPage, EmptyPage, PageNotAnInteger, Paginator, Page
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q, Case, When, Value, IntegerField
+from django.db.models.sql.datastructures import EmptyResultSet
+from django.utils.translation import ugettext_lazy as _
+
+from .exceptions import SetupCrudError
+
+NEXT, PREVIOUS = 'n', 'p'
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+    """
+    DjangoJSONEncoder truncates times to milliseconds, cursors need exact values.
+    """
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super(CursorJSONEncoder, self).default(o)
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by "seeking" from the ordering values of the first or last item of the current page
+    rather than with OFFSET, so the time to get a page doesn't depend on how deep into the list it is.
+
+    Pages are identified by opaque cursors rather than numbers, the queryset's ordering is used with
+    the primary key added as a tie breaker. Nulls in nullable fields are ordered after every value (before
+    them if the field is ordered descending) whatever the database's default.
+
+    Objects are never counted so count is None as with HasNextPaginator.
+    """
+    count = None
+
+    def __init__(self, queryset, per_page, ordering=None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = self._get_ordering(ordering or queryset.query.order_by or queryset.model._meta.ordering)
+
+    def page(self, cursor=None):
+        """
+        Returns a KeysetPage for the given cursor, if cursor is None the first page is returned.
+        """
+        direction, values = self.decode_cursor(cursor) if cursor else (NEXT, None)
+        return self._get_page(direction, values)
+
+    def iter_pages(self):
+        """
+        Generate every page in turn, eg. to process a large queryset in chunks without keeping it all in memory.
+        """
+        page = self._get_page(NEXT, None)
+        yield page
+        while page.has_next():
+            page = self._get_page(NEXT, self.get_values(page.object_list[-1]))
+            yield page
+
+    def _get_page(self, direction, values):
+        reverse = direction == PREVIOUS
+        qs, order_by = self.queryset, []
+        for i, (lookup, desc, field, nullable) in enumerate(self.ordering):
+            prefix = '-' if desc != reverse else ''
+            if nullable:
+                null_alias = 'crud_keyset_null_{}'.format(i)
+                is_null = Case(When(then=Value(1), **{lookup + '__isnull': True}), default=Value(0),
+                               output_field=IntegerField())
+                qs = qs.annotate(**{null_alias: is_null})
+                order_by.append(prefix + null_alias)
+            order_by.append(prefix + lookup)
+        qs = qs.order_by(*order_by)
+        if values is not None:
+            qs = qs.filter(self._seek_filter(values, reverse))
+        object_list = list(qs[:self.per_page + 1])
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if reverse:
+            object_list.reverse()
+            return KeysetPage(object_list, self, has_next=True, has_previous=has_more)
+        return KeysetPage(object_list, self, has_next=has_more, has_previous=values is not None)
+
+    def _get_ordering(self, ordering):
+        meta = self.queryset.model._meta
+        keyset_ordering = []
+        for order in ordering:
+            if not isinstance(order, str) or order == '?':
+                raise SetupCrudError('keyset pagination can only order by fields, not {!r}'.format(order))
+            desc, lookup = order.startswith('-'), order.lstrip('-')
+            lookup, field, nullable = self._resolve_lookup(meta, lookup)
+            keyset_ordering.append((lookup, desc, field, nullable))
+
+        if not any(field == meta.pk for lookup, desc, field, nullable in keyset_ordering):
+            keyset_ordering.append((meta.pk.attname, False, meta.pk, False))
+        return keyset_ordering
+
+    @staticmethod
+    def _resolve_lookup(meta, lookup):
+        """
+        Find the field a lookup refers to and whether it may be null, foreign keys are replaced by their
+        primary key so they're compared directly.
+        :return: (lookup, field, nullable)
+        """
+        parts = lookup.split('__')
+        field, nullable = None, False
+        for i, part in enumerate(parts):
+            field = meta.pk if part == 'pk' else meta.get_field(part)
+            nullable = nullable or field.null
+            if field.rel:
+                if i == len(parts) - 1:
+                    parts[-1] = field.attname if i == 0 else parts[-1] + '__pk'
+                    field = field.rel.to._meta.pk
+                else:
+                    meta = field.rel.to._meta
+        return '__'.join(parts), field, nullable
+
+    def _seek_filter(self, values, reverse):
+        """
+        Filter for items after (or before if reverse) those with the given ordering values, equivalent to
+        "(a, b, pk) > (va, vb, vpk)" with the direction of each comparison set by the ordering.
+        """
+        q = None
+        for i, (lookup, desc, field, nullable) in enumerate(self.ordering):
+            clause = self._compare(lookup, values[i], desc == reverse, nullable)
+            if clause is None:
+                continue
+            for prev_ordering, prev_value in zip(self.ordering[:i], values):
+                clause &= self._equal(prev_ordering[0], prev_value)
+            q = clause if q is None else q | clause
+        return q
+
+    @staticmethod
+    def _compare(lookup, value, after, nullable):
+        """
+        Filter for values greater (or less if not after) than value, null is greater than every value.
+        :return: Q or None if no value is greater
+        """
+        if value is None:
+            return None if after else Q(**{lookup + '__isnull': False})
+        if not after:
+            return Q(**{lookup + '__lt': value})
+        q = Q(**{lookup + '__gt': value})
+        return q | Q(**{lookup + '__isnull': True}) if nullable else q
+
+    @staticmethod
+    def _equal(lookup, value):
+        return Q(**{lookup + '__isnull': True}) if value is None else Q(**{lookup: value})
+
+    def get_values(self, obj):
+        values = []
+        for lookup, desc, field, nullable in self.ordering:
+            value = obj
+            for part in lookup.split('__'):
+                value = getattr(value, part)
+                if value is None:
+                    break
+            values.append(value)
+        return values
+
+    def encode_cursor(self, direction, obj):
+        data = json.dumps([direction] + self.get_values(obj), cls=CursorJSONEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, *values = json.loads(data.decode())
+            if direction not in (NEXT, PREVIOUS) or len(values) != len(self.ordering):
+                raise ValueError('wrong cursor format')
+            values = [o[2].to_python(v) for v, o in zip(values, self.ordering)]
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            raise InvalidPage(_('Invalid cursor'))
+        return direction, values
+
+
+class KeysetPage:
+    """
+    Page of items from KeysetPaginator, similar to django.core.paginator.Page but without page numbers.
+    """
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next and bool(object_list)
+        self._has_previous = has_previous and bool(object_list)
+
+    def __repr__(self):
+        return '<Keyset page of {} items>'.format(len(self))
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next:
+            return self.paginator.encode_cursor(NEXT, self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous:
+            return self.paginator.encode_cursor(PREVIOUS, self.object_list[0])
+
+
+class HasNextPaginator(Paginator):
+    """
+    Paginator which never counts the objects, instead one extra object is fetched with each page to find if
+    there's a next page. count, num_pages and page_range are None.
+    """
+    count = num_pages = page_range = None
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not object_list and number > 1:
+            raise EmptyPage('That page contains no results')
+        return HasNextPage(object_list[:self.per_page], number, self, len(object_list) > self.per_page)
+
+
+class HasNextPage(Page):
+    def __init__(self, object_list, number, paginator, has_next):
+        super(HasNextPage, self).__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def __repr__(self):
+        return '<Page %s>' % self.number
+
+    def has_next(self):
+        return self._has_next
+
+    def end_index(self):
+        return self.start_index() + len(self) - 1
+
+
+def exact_count(queryset, view):
+    return queryset.count()
+
+
+def _query_key(prefix, queryset):
+    sql, params = queryset.query.sql_with_params()
+    return '{}:{}'.format(prefix, hashlib.md5('{}{!r}'.format(sql, params).encode()).hexdigest())
+
+
+def cached_count(queryset, view):
+    """
+    Count the queryset, the count is cached for view.count_cache_timeout seconds.
+    """
+    try:
+        key = _query_key('crud-count', queryset.order_by())
+    except EmptyResultSet:
+        return 0
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, view.count_cache_timeout)
+    return count
+
+
+def estimate_count(queryset, view):
+    """
+    Estimate the count using statistics from postgres: reltuples for the whole table or the planner's estimate
+    if the queryset is filtered. Small estimates (below view.count_estimate_threshold) are replaced by an
+    exact count, as is the estimate for other databases.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    with connection.cursor() as cursor:
+        if queryset.query.where:
+            try:
+                sql, params = queryset.order_by().query.sql_with_params()
+            except EmptyResultSet:
+                return 0
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            estimate = cursor.fetchone()[0][0]['Plan']['Plan Rows']
+        else:
+            cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+            estimate = row and row[0]
+    if estimate is None or estimate < view.count_estimate_threshold:
+        return queryset.count()
+    return int(estimate)
+
+
+def counter_key(model):
+    return 'crud-counter:{}.{}'.format(model._meta.app_label, model._meta.model_name)
+
+
+def counter_count(queryset, view):
+    """
+    Use a counter of the model's objects kept in the cache and updated by update_counter when controllers
+    create and delete objects. Querysets which are filtered in any way are counted exactly.
+    """
+    if queryset.query.where:
+        return queryset.count()
+    key = counter_key(queryset.model)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, None)
+    return count
+
+
+def update_counter(model, change):
+    """
+    Update the counter for model used by counter_count, if change is None the counter is reset.
+    """
+    key = counter_key(model)
+    if change is None:
+        cache.delete(key)
+        return
+    try:
+        cache.incr(key, change)
+    except ValueError:
+        # counter isn't set, it will be counted when it's next required
+        pass
+
+
+def has_next_count(queryset, view):
+    return None
+
+
+#: strategies for counting the items in a list, each is called with (queryset, view) and should return the count
+#: or None if it's unknown in which case the list is paginated with HasNextPaginator
+COUNT_STRATEGIES = {
+    'exact': exact_count,
+    'cached': cached_count,
+    'estimate': estimate_count,
+    'counter': counter_count,
+    'has_next': has_next_count,
+}
@@ -1,21 +1,43 @@
+import codecs
+import csv
 import datetime
+import hashlib
+import inspect
 import logging
+import operator
+from collections import OrderedDict
 from decimal import Decimal
+from functools import lru_cache
 
-from django.core.urlresolvers import reverse, NoReverseMatch
+from django.core.paginator import InvalidPage
 from django.conf import settings
-from django.db import models
+from django.core.exceptions import FieldDoesNotExist, ValidationError, NON_FIELD_ERRORS
+from django.core.urlresolvers import get_script_prefix, get_urlconf
+from django.db import models, transaction, IntegrityError
+from django.http import Http404, JsonResponse
 from django.db.models.query import QuerySet
 from django.utils.safestring import mark_safe
 from django.utils.html import escape
-from django.utils.functional import cached_property
-from django.utils.formats import date_format, time_format, number_format
-from django.utils.translation import ugettext_lazy as _
-
-from .exceptions import AttrCrudError, SetupCrudError, ReverseCrudError
+from django.utils.functional import cached_property, Promise
+from django.utils.translation import ugettext_lazy as _, ugettext, get_language
+from markupsafe import Markup, escape as markup_escape
+
+from .exceptions import AttrCrudError, SetupCrudError
+from .filters import get_list_filter, count_facet_values
+from .forms import SearchForm
+from .formats import LocaleFormatter
+from .links import reverse_object_url
+from .pagination import KeysetPaginator, HasNextPaginator, COUNT_STRATEGIES
+from .row_cache import RowCache, invalidate_rows, row_cache_enabled
+from .search import get_search_backend
+from .timing import timing_phase
 
 logger = logging.getLogger('django')
 
+#: (model, lookup) pairs already checked for an index by ItemDisplayMixin._check_sort_index, each is only
+#: warned about once per process
+_checked_sort_indexes = set()
+
 
 def maybe_call(value_or_func, *args, **kwargs):
     return value_or_func(*args, **kwargs) if callable(value_or_func) else value_or_func
@@ -43,24 +65,99 @@ class RichViewMixin:
         else:
             return alt
 
-    def check_show_button(self, button):
-        if button is None or ('url' in button and button['url'] is None):
-            return False
-        if not isinstance(button, dict):
-            return True
-        if 'show_if' not in button:
-            return True
-        if button['show_if'] in {True, False}:
-            return button['show_if']
-        show_if = self.getattr(button['show_if'])
-        return bool(maybe_call(show_if))
-
     def process_buttons(self, button_group):
+        """
+        Evaluate buttons for this request. Buttons are compiled by _compile_buttons, the compiled version of
+        the view's own buttons is kept on the view class so only "show_if", "func|" and "rev|" urls requiring
+        the object are evaluated on each request; buttons are never modified.
+        :return: new lists and dicts with urls and texts found
+        """
+        cls = self.__class__
+        if button_group is not None and button_group is self.buttons:
+            compiled = cls.__dict__.get('_compiled_buttons')
+            if compiled is None or compiled[0] is not button_group:
+                compiled = cls._compiled_buttons = button_group, self._compile_buttons(button_group)
+            plan = compiled[1]
+        else:
+            plan = self._compile_buttons(button_group)
+        return self._render_buttons(plan)
+
+    def _compile_buttons(self, button_group):
+        """
+        Compile a button or group of buttons: groups become tuples of (show_if, compiled item) with buttons
+        hidden by "show_if" or a url of None removed, buttons become ButtonInfo instances.
+        """
         if not button_group:
-            return []
-        if not isinstance(button_group, (dict, str)):
-            return [self.process_buttons(button) for button in button_group if self.check_show_button(button)]
-        return self.process_button(button_group)
+            return ()
+        if isinstance(button_group, (dict, str)):
+            return self._compile_button(button_group)
+        compiled = []
+        for button in button_group:
+            show_if = None
+            if isinstance(button, dict):
+                if 'url' in button and button['url'] is None:
+                    continue
+                show_if = button.get('show_if')
+                if show_if in {True, False}:
+                    if not show_if:
+                        continue
+                    show_if = None
+            elif button is None:
+                continue
+            compiled.append((show_if, self._compile_buttons(button)))
+        return tuple(compiled)
+
+    def _compile_button(self, button):
+        if isinstance(button, str):
+            info = ButtonInfo({'text': button, 'url': button})
+            info.text = self.get_sub_attr(button, raw=True)
+        else:
+            info = ButtonInfo(button)
+
+        if 'url' in info.data:
+            self._compile_url(info, info.data['url'])
+        elif 'dropdown' in info.data:
+            dropdown = info.data['dropdown']
+            if isinstance(dropdown, str) and dropdown.startswith('func|'):
+                info.dropdown_func = dropdown[5:]
+            else:
+                info.dropdown = tuple(map(self._compile_button, dropdown))
+        else:
+            raise SetupCrudError('neither "url" nor "dropdown" found in button: {!r}'.format(button))
+        return info
+
+    def _compile_url(self, info, value):
+        if isinstance(value, str) and value.startswith('func|'):
+            info.url_func = value[5:]
+        elif isinstance(value, str) and value.startswith('rev|'):
+            # reversed on each request since urls depend on the language and script prefix,
+            # reverse_object_url caches them for each
+            info.rev_view_name = value[4:]
+        else:
+            info.url = self.get_url(value)
+
+    def _render_buttons(self, plan):
+        if isinstance(plan, ButtonInfo):
+            return self._render_button(plan)
+        return [self._render_buttons(item) for show_if, item in plan
+                if show_if is None or maybe_call(self.getattr(show_if))]
+
+    def _render_button(self, info):
+        button = dict(info.data)
+        if info.text:
+            button['text'] = info.text.format(**self.label_ctx)
+        if info.url_func:
+            button['url'] = self.getattr(info.url_func)()
+        elif info.rev_view_name:
+            button['url'] = self.get_rev_url(info.rev_view_name, getattr(self, 'object', None))
+        elif 'url' in button:
+            button['url'] = info.url
+        elif info.dropdown_func:
+            button['dropdown'] = [self._render_button(self._compile_button(b))
+                                  for b in self.getattr(info.dropdown_func)()]
+        else:
+            button['dropdown'] = list(map(self._render_button, info.dropdown))
+        return button
 
     def get_url(self, value):
         if isinstance(value, str):
@@ -76,41 +173,13 @@ class RichViewMixin:
         return value
 
     def get_rev_url(self, view_name, obj=None):
-        rev_tries = [{'viewname': view_name}]
-        if isinstance(obj, models.Model):
-            rev_tries.append({'viewname': view_name, 'args': (obj.pk,)})
-
-        url = None
-        for rev_try in rev_tries:
-            try:
-                url = reverse(**rev_try)
-            except NoReverseMatch:
-                pass
-            else:
-                break
-        if url is None:
-            raise ReverseCrudError('No reverse found for "{}"'.format(view_name))
-        return url
-
-    def process_button(self, button):
-        if isinstance(button, str):
-            button = {
-                'text': self.get_sub_attr(button) or button,
-                'url': button,
-            }
-
-        if 'url' in button:
-            button['url'] = self.get_url(button['url'])
-        elif 'dropdown' in button:
-            if isinstance(button['dropdown'], str) and button['dropdown'].startswith('func|'):
-                fname = button['dropdown'].split('|', 1)[1]
-                button['dropdown'] = self.getattr(fname)()
-            button['dropdown'] = list(map(self.process_button, button['dropdown']))
-        else:
-            raise SetupCrudError('neither "url" nor "dropdown" found in button: {!r}'.format(button))
-        return button
+        """
+        Reverse view_name without arguments or if that fails with the primary key of obj, see
+        django_crud.links.reverse_object_url.
+        """
+        return reverse_object_url(view_name, obj)
 
-    @cached_property
+    @property
     def label_ctx(self):
         return dict(
             verbose_name=self._meta.verbose_name,
@@ -118,12 +187,13 @@ class RichViewMixin:
             object=getattr(self, 'object', None),
         )
 
-    def get_sub_attr(self, attr_name, obj=None, prop_name='short_description'):
+    def get_sub_attr(self, attr_name, obj=None, prop_name='short_description', raw=False):
         """
         get a property of an object's attribute by name.
         :param obj: object to look at
         :param attr_name: name to get short_description for
         :param prop_name: name of property to get, typically "short_description"
+        :param raw: whether to return the property without formatting it with label_ctx
         :return: property value or None
         """
         attr_name = attr_name.split('|', 1)[-1]
@@ -135,14 +205,16 @@ class RichViewMixin:
         if attr:
             v = getattr(attr, prop_name, None)
             if v is not None:
-                return v.format(**self.label_ctx)
+                return v if raw else v.format(**self.label_ctx)
 
     def get_buttons(self):
         return self.buttons
 
     def get_context_data(self, **kwargs):
+        with timing_phase(self, 'buttons'):
+            buttons = self.process_buttons(self.get_buttons())
         kwargs.update(
-            buttons=self.process_buttons(self.get_buttons()),
+            buttons=buttons,
             title=self.get_title(),
             model_name=self._meta.verbose_name,
             plural_model_name=self._meta.verbose_name_plural,
@@ -155,6 +227,24 @@ class RichViewMixin:
 
 RENDER_MAILTO = getattr(settings, 'RENDER_MAILTO', True)
 
+#: types of values for model fields, used to choose the formatter for each column; order matters as
+#: some fields are subclasses of others
+FIELD_VALUE_TYPES = [
+    ((models.BooleanField, models.NullBooleanField), bool),
+    ((models.DateTimeField,), datetime.datetime),
+    ((models.DateField,), datetime.date),
+    ((models.TimeField,), datetime.time),
+    ((models.DecimalField,), Decimal),
+    ((models.FloatField,), float),
+    ((models.IntegerField, models.AutoField), int),
+    ((models.CharField, models.TextField), str),
+]
+
+
+@lru_cache(maxsize=None)
+def choices_dict(field):
+    return dict(field.choices)
+
 
 # noinspection PyMethodMayBeStatic
 class FormatMixin:
@@ -163,13 +253,14 @@ class FormatMixin:
 
     Reasonable defaults are provided, but most thing scan be changed.
     """
+    #: number of formatted numbers, dates and times remembered by the locale formatter
+    format_cache_size = 512
 
     def fmt_none_empty(self, value):
         return mark_safe('&mdash;')
 
     def fmt_field_choices(self, value, field):
-        choice_dict = dict(field.choices)
-        return choice_dict.get(value, value)
+        return choices_dict(field).get(value, value)
 
     def fmt_email_field(self, value):
         if RENDER_MAILTO:
@@ -185,25 +276,52 @@ class FormatMixin:
         return mark_safe('<span class="glyphicon glyphicon-{} bool"></span>'.format(icon))
 
     def fmt_iter(self, value):
-        return ', '.join(map(self.format_value, value))
+        return ', '.join(str(self.format_value(v)) for v in value)
+
+    @property
+    def locale_formatter(self):
+        """
+        LocaleFormatter for the active language, it's kept on the instance (so for the duration of a request)
+        and replaced if the language changes.
+        """
+        lang = get_language()
+        formatter = self.__dict__.get('_locale_formatter')
+        if formatter is None or formatter.lang != lang:
+            formatter = self._locale_formatter = LocaleFormatter(lang, self.format_cache_size)
+        return formatter
 
     def fmt_number(self, value):
-        return number_format(value)
+        return self.locale_formatter.number(value)
 
     def fmt_datetime(self, value):
-        return date_format(value, 'DATETIME_FORMAT')
+        return self.locale_formatter.datetime(value)
 
     def fmt_date(self, value):
-        return date_format(value)
+        return self.locale_formatter.date(value)
 
     def fmt_time(self, value):
-        return time_format(value, 'TIME_FORMAT')
+        return self.locale_formatter.time(value)
+
+    #: names of the methods used to format values of each type when the type is known in advance,
+    #: None means the value is used unchanged
+    type_formatters = {
+        bool: 'fmt_bool',
+        Decimal: 'fmt_number',
+        float: 'fmt_number',
+        int: 'fmt_number',
+        datetime.datetime: 'fmt_datetime',
+        datetime.date: 'fmt_date',
+        datetime.time: 'fmt_time',
+        str: None,
+    }
 
     def format_value(self, value, field=None):  # noqa, cyclomatic complexity > 10
+        """
+        Format any value, this is the generic path used when the type of a value isn't known in advance.
+        """
         if callable(value):
             value = value()
-        elif value in (None, ''):
-            print('fmt_none_empty', repr(self.fmt_none_empty(value)))
+        if value in (None, ''):
             return self.fmt_none_empty(value)
         elif field and len(field.choices) > 0:
             return self.fmt_field_choices(value, field)
@@ -251,26 +369,362 @@ class ItemDisplayMixin(FormatMixin, RichViewMixin):
     #: field to order the model by, if None no ordering is performed here
     order_by = None
 
+    #: related objects to get with select_related, if None they're found from the foreign keys in display_items,
+    #: set to an empty list to disable
+    select_related = None
+
+    #: related objects to get with prefetch_related, if None they're found from the many to many fields
+    #: in display_items, set to an empty list to disable
+    prefetch_related = None
+
+    #: if True the queryset is restricted with .only() to the columns required by display_items
+    prune_columns = False
+
+    #: extra columns to load when prune_columns is True, eg. fields used by "func|" items or the model's __str__
+    extra_columns = []
+
     #: number of items to show on each each page
     paginate_by = 20
 
+    #: how list views are paginated, either "offset" to use django's paginator with "?page=<number>" or
+    #: "keyset" to use KeysetPaginator with "?cursor=<cursor>" which remains fast however deep the page
+    pagination = 'offset'
+
+    #: how the items in the list are counted for offset pagination, either a key of COUNT_STRATEGIES:
+    #: * "exact": always count with "SELECT COUNT(*)"
+    #: * "cached": count then cache the result for count_cache_timeout seconds
+    #: * "estimate": use the database's estimate (postgres only), exact counts are used below
+    #:   count_estimate_threshold
+    #: * "counter": keep a count of all objects in the cache updated when the controller creates or deletes objects
+    #: * "has_next": never count, just find if there's a next page
+    #: or a function taking (queryset, view) and returning the count or None if it's unknown
+    count_strategy = 'exact'
+    count_cache_timeout = 60
+    count_estimate_threshold = 1000
+
     extra_field_info = {}
 
+    #: whether to make values links when using "link|" and "rev|" display items
+    link_values = True
+
+    #: attr_names of display items which the list can be sorted by with the "o" GET parameter, None for every item
+    #: found by a lookup (not "func|" items or methods), an empty list to disable sorting
+    sortable_items = None
+
+    #: fields searched with the "q" GET parameter, see django_crud.search.SearchBackend
+    search_fields = []
+
+    #: filters for list views, each item is either a field lookup (with choices, a foreign key, a boolean or a date)
+    #: or an instance of a django_crud.filters.ListFilter subclass
+    list_filters = []
+    #: seconds to cache the counts of each filter's values for, None to count on every request
+    facet_cache_timeout = None
+
+    #: whether list views cache each rendered row, see RowCache, requires settings.CRUD_ROW_CACHE
+    row_cache = False
+    row_cache_timeout = 300
+    #: field which changes whenever an object changes eg. a last modified datetime or version counter; it's part
+    #: of row cache keys so changes which don't send signals are also seen
+    row_version_field = None
+
     def __init__(self, *args, **kwargs):
         super(ItemDisplayMixin, self).__init__(*args, **kwargs)
-        self._field_names = [f.name for f in self._meta.fields]
         self._extra_attrs = []
+        if getattr(self, 'timing', None):
+            self._item_value = self.timing.timed('formatting', self._item_value)
 
     def get_queryset(self):
         """
         Overrides standard the standard get_queryset to order the qs and call select_related.
         :return:
         """
-        qs = super(ItemDisplayMixin, self).get_queryset()
-        if self.order_by:
-            qs = qs.order_by(*self.order_by)
+        with timing_phase(self, 'queryset'):
+            qs = super(ItemDisplayMixin, self).get_queryset()
+            select_related = self.get_select_related()
+            if select_related:
+                qs = qs.select_related(*select_related)
+            prefetch_related = self.get_prefetch_related()
+            if prefetch_related:
+                qs = qs.prefetch_related(*prefetch_related)
+            if self.prune_columns:
+                qs = qs.only(*self.get_only_columns())
+            qs = self.filter_queryset(qs)
+            order_by = self.get_sort_order()
+            if order_by:
+                qs = qs.order_by(*order_by)
+            return qs
+
+    def get_sortable(self):
+        """
+        Find the display items the list can be sorted by: those found by a lookup (so not "func|" items, methods
+        or many to many fields) limited to sortable_items if it's not None.
+        :return: dict of {attr_name: lookup to order by}
+        """
+        sortable = {fi.attr_name: fi.column for fi in self._item_info
+                    if fi.column and not fi.is_func and not fi.prefetch_related}
+        if self.sortable_items is not None:
+            sortable = {k: v for k, v in sortable.items() if k in self.sortable_items}
+        return sortable
+
+    def get_sort(self):
+        """
+        Find the sort requested by the "o" GET parameter, "o=<attr_name>" or "o=-<attr_name>" for descending.
+        :return: tuple of (attr_name, descending) or None if there's no sort or it's not allowed
+        """
+        request = getattr(self, 'request', None)
+        o = request and request.GET.get('o')
+        if o:
+            attr_name, descending = o.lstrip('-'), o.startswith('-')
+            if attr_name in self.get_sortable():
+                return attr_name, descending
+
+    def get_sort_order(self):
+        """
+        return the lookups to order the queryset by: the requested sort with the primary key as a tie breaker
+        so pages are stable, otherwise order_by.
+        """
+        sort = self.get_sort()
+        if sort is None:
+            return self.order_by
+        attr_name, descending = sort
+        lookup = self.get_sortable()[attr_name]
+        if settings.DEBUG:
+            self._check_sort_index(lookup)
+        prefix = '-' if descending else ''
+        return [prefix + lookup, prefix + 'pk']
+
+    def _check_sort_index(self, lookup):
+        """
+        Warn if the field sorted by isn't indexed so sorting will require the database to sort the whole table.
+        """
+        if (self.model, lookup) in _checked_sort_indexes:
+            return
+        _checked_sort_indexes.add((self.model, lookup))
+        meta = self._meta
+        for part in lookup.split('__'):
+            field = meta.get_field(part)
+            meta = field.rel.to._meta if field.rel else meta
+        field_meta = field.model._meta
+        indexed = (field.primary_key or field.unique or field.db_index or
+                   any(together[0] == field.name for together in field_meta.index_together))
+        if not indexed:
+            logger.warning('%s list sorted by "%s" which has no index', field_meta.object_name, lookup)
+
+    def get_columns(self):
+        """
+        Find metadata for each display item from the display plan, no objects are evaluated so this is
+        suitable for table headers.
+        :return: list of dicts with keys: attr_name, name, help_text, extra, css, is_long, is_func and sortable
+        """
+        sortable, labels = self.get_sortable(), self._item_labels
+        return [{
+            'attr_name': fi.attr_name,
+            'name': labels[fi.attr_name][0],
+            'help_text': labels[fi.attr_name][1],
+            'extra': fi.extra,
+            'css': fi.extra.get('css', ''),
+            'is_long': bool(fi.is_long),
+            'is_func': fi.is_func,
+            'sortable': fi.attr_name in sortable,
+        } for fi in self._item_info]
+
+    def sort_headers(self):
+        """
+        Find the headers of short display items for list views with links to sort by them.
+        :return: list of dicts as returned by get_columns with extra keys: sort_url and sorted ("asc", "desc"
+          or None)
+        """
+        sort = self.get_sort()
+        get_args = self.request.GET.copy()
+        for key in ('page', 'cursor'):
+            get_args.pop(key, None)
+        headers = []
+        for header in self.get_columns():
+            if header['is_long']:
+                continue
+            header.update(sort_url=None, sorted=None)
+            if header['sortable']:
+                if sort and sort[0] == header['attr_name']:
+                    header['sorted'] = 'desc' if sort[1] else 'asc'
+                get_args['o'] = '-' + header['attr_name'] if header['sorted'] == 'asc' else header['attr_name']
+                header['sort_url'] = '?' + get_args.urlencode()
+            headers.append(header)
+        return headers
+
+    def get_search_query(self):
+        return self.request.GET.get('q', '').strip() if self.search_fields else ''
+
+    def filter_queryset(self, qs, exclude=None):
+        """
+        Apply the search query and the values of list_filters from GET parameters to the queryset.
+        :param exclude: list filter to skip, used to count the values of that filter
+        """
+        query = self.get_search_query()
+        if query:
+            qs = get_search_backend(self.model, self.search_fields, qs.db).filter(qs, query)
+        for list_filter, value in self._filter_values:
+            if value is not None and list_filter is not exclude:
+                qs = list_filter.filter(qs, value)
         return qs
 
+    def get_list_filters(self):
+        return [get_list_filter(self.model, item) for item in self.list_filters]
+
+    @cached_property
+    def _filter_values(self):
+        """
+        list of (list filter, value to filter by or None) found once per request.
+        """
+        request = getattr(self, 'request', None)
+        query_dict = request.GET if request else {}
+        return [(list_filter, list_filter.get_value(query_dict)) for list_filter in self.get_list_filters()]
+
+    def get_facets(self):
+        """
+        Find data for the filter panel: options of each list filter with the number of objects for each option
+        found by one grouped query on the list filtered by the other filters. Counts are cached for
+        facet_cache_timeout seconds if it's not None.
+        :return: list of dicts, see ListFilter.facet
+        """
+        base_qs = super(ItemDisplayMixin, self).get_queryset()
+        query_dict = self.request.GET.copy()
+        for key in ('page', 'cursor'):
+            query_dict.pop(key, None)
+        facets = []
+        for list_filter, value in self._filter_values:
+            qs = self.filter_queryset(base_qs, exclude=list_filter)
+            rows = count_facet_values(list_filter, qs, self.facet_cache_timeout)
+            facets.append(list_filter.facet(value, rows, query_dict))
+        return facets
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Only relevant on list view. Paginate the queryset with KeysetPaginator if pagination is "keyset".
+        """
+        if self.pagination not in ('offset', 'keyset'):
+            raise SetupCrudError('pagination should be "offset" or "keyset", not {!r}'.format(self.pagination))
+        if self.pagination == 'offset':
+            return super(ItemDisplayMixin, self).paginate_queryset(queryset, page_size)
+        paginator = KeysetPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidPage as e:
+            raise Http404(str(e))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        """
+        Only relevant on list view. Returns a Paginator with its count found using count_strategy.
+        """
+        count = self.get_count(queryset)
+        if count is None:
+            return HasNextPaginator(queryset, per_page, **kwargs)
+        paginator = super(ItemDisplayMixin, self).get_paginator(queryset, per_page, **kwargs)
+        paginator._count = count
+        return paginator
+
+    def get_count(self, queryset):
+        count_strategy = self.count_strategy
+        if not callable(count_strategy):
+            try:
+                count_strategy = COUNT_STRATEGIES[count_strategy]
+            except KeyError:
+                raise SetupCrudError('count_strategy should be one of {}, not {!r}'.format(
+                    ', '.join(sorted(COUNT_STRATEGIES)), count_strategy))
+        return count_strategy(queryset, self)
+
+    def get_select_related(self):
+        """
+        return related objects to select with the queryset. Override to customise.
+        :return: list of lookups to pass to select_related
+        """
+        if self.select_related is not None:
+            return self.select_related
+        return self._unique(fi.select_related for fi in self._item_info if fi.select_related)
+
+    def get_prefetch_related(self):
+        """
+        return related objects to prefetch with the queryset. Override to customise.
+        :return: list of lookups to pass to prefetch_related
+        """
+        if self.prefetch_related is not None:
+            return self.prefetch_related
+        return self._unique(fi.prefetch_related for fi in self._item_info if fi.prefetch_related)
+
+    def get_only_columns(self):
+        """
+        return the columns to load when prune_columns is True, these are the fields used by display_items,
+        extra_columns, row_version_field, the controller's last_modified_field, the ordering read by
+        KeysetPaginator and the foreign keys required by select_related.
+        :return: list of lookups to pass to only
+        """
+        columns = [self._meta.pk.name] + list(self.extra_columns)
+        columns += [fi.column for fi in self._item_info if fi.column]
+        if self.pagination == 'keyset':
+            columns += self._ordering_columns()
+        if self.row_cache and self.row_version_field:
+            columns.append(self.row_version_field)
+        last_modified_field = getattr(getattr(self, 'ctrl', None), 'last_modified_field', None)
+        if last_modified_field:
+            columns.append(last_modified_field)
+        for lookup in self.get_select_related():
+            if not any(c == lookup or c.startswith(lookup + '__') for c in columns):
+                columns.append(lookup)
+        # where a related object is displayed itself all its fields are required, naming any of them
+        # would cause the others to be deferred
+        whole_objects = tuple(fi.column + '__' for fi in self._item_info if fi.column and
+                              fi.column == fi.select_related)
+        return self._unique(c for c in columns if not c.startswith(whole_objects))
+
+    def _ordering_columns(self):
+        """
+        return the columns needed to read the values of the list's ordering from each object, lookups through
+        relations which aren't selected only need the foreign key since the related object is loaded anyway.
+        """
+        select_related = self.get_select_related()
+        columns = []
+        for order in self.get_sort_order() or self._meta.ordering:
+            if not isinstance(order, str):
+                continue
+            lookup = order.lstrip('-')
+            if '__' in lookup and lookup.rsplit('__', 1)[0] not in select_related:
+                lookup = lookup.split('__', 1)[0]
+            if lookup not in ('pk', '?'):
+                columns.append(lookup)
+        return columns
+
+    @staticmethod
+    def _unique(items):
+        return list(OrderedDict.fromkeys(items))
+
+    def get_row_cache(self, object_list):
+        """
+        Only relevant on list view.
+        :return: RowCache for object_list or None if row_cache is False
+        """
+        if self.row_cache:
+            if not row_cache_enabled():
+                raise SetupCrudError('row_cache requires CRUD_ROW_CACHE = True in settings so rows are invalidated '
+                                     'when objects change')
+            return RowCache(self, object_list)
+
+    def get_row_cache_prefix(self):
+        """
+        return the part of row cache keys identifying this view (or its controller), its display plan and where
+        it's mounted, rows contain urls so the same controller included under different urls can't share them.
+        """
+        ctrl = getattr(self, 'ctrl', None)
+        owner = (ctrl or self).__class__
+        plan = repr((self.get_display_items(), self.extra_field_info, self.link_values,
+                     ctrl and ctrl.url_prefix, get_script_prefix(), get_urlconf()))
+        return '{}.{}:{}'.format(owner.__module__, owner.__qualname__, hashlib.md5(plan.encode()).hexdigest())
+
+    def get_row_cache_models(self):
+        """
+        return the related models display items traverse, rows are invalidated when any of their objects change.
+        """
+        return self._unique(m for fi in self._item_info for m in fi.related_models if m != self.model)
+
     def get_detail_url(self, obj):
         """
         Only relevant on list view.
@@ -307,12 +761,94 @@ class ItemDisplayMixin(FormatMixin, RichViewMixin):
     @cached_property
     def _item_info(self):
         """
-        Returns a list of FieldInfo instances.
+        Returns a list of FieldInfo instances, this is the "display plan" for the view.
+
+        Plans are compiled once per view class and set of display items then shared between instances (and
+        therefore requests) so each request only has to execute the plan.
+        :return: list of FieldInfo instances for each item in display_items
+        """
+        return self._get_display_plan(self.get_display_items())
+
+    def _get_display_plan(self, display_items):
+        """
+        Find or compile the display plan for display_items, plans are stored on the view class.
+
+        Since the plan is shared between requests, short_descriptions and help_texts of functions and attributes
+        are kept unformatted (and untranslated if lazy) in the plan, they're formatted for each request by
+        _item_labels.
+        """
+        cls = self.__class__
+        plans = cls.__dict__.get('_display_plans')
+        if plans is None:
+            plans = cls._display_plans = {}
+        try:
+            key = tuple(display_items)
+            plan = plans.get(key)
+        except TypeError:
+            # unhashable display items, we can't cache the plan
+            return self._compile_display_plan(display_items)
+        if plan is None:
+            plan = plans[key] = self._compile_display_plan(display_items)
+        return plan
+
+    def _compile_display_plan(self, display_items):
+        field_names = [f.name for f in self._meta.fields]
+        plan = []
+        for attr_name in display_items:
+            field_info = self._getattr_info(attr_name, field_names)
+            field_info.help_text = field_info.help_text or None
+            field_info.extra = self.extra_field_info.get(field_info.attr_name, {})
+            plan.append(field_info)
+        return plan
+
+    @cached_property
+    def _formatters(self):
+        """
+        Formatters for each non "func|" display item bound once per request, see _bind_formatter.
+        """
+        return {fi.attr_name: self._bind_formatter(fi) for fi in self._item_info if not fi.is_func}
+
+    def _bind_formatter(self, field_info):
+        """
+        Create a function to format values of one column.
+
+        If the type of the column's values is known the formatter is chosen here, once, rather than for every
+        value; values of any other type fall back to format_value.
+        """
+        generic, field, value_type = self.format_value, field_info.field, field_info.value_type
+        if field is not None and field.choices:
+            fmt_choices = self.fmt_field_choices
+
+            def format_column(value):
+                if value is None or value == '':
+                    return generic(value, field)
+                return fmt_choices(value, field)
+        elif value_type is None:
+            def format_column(value):
+                return generic(value, field)
+        else:
+            fmt = self._type_formatter(value_type, field)
+
+            def format_column(value):
+                if value.__class__ is value_type and value != '':
+                    return fmt(value)
+                return generic(value, field)
+        return format_column
+
+    def _type_formatter(self, value_type, field):
+        if isinstance(field, models.EmailField):
+            return self.fmt_email_field
+        elif isinstance(field, models.URLField):
+            return self.fmt_url_field
+        fmt_name = self.type_formatters.get(value_type)
+        return getattr(self, fmt_name) if fmt_name else lambda value: value
 
-        After the first call the list is cached to improve performance.
-        :return: list of tuples for each item in display_items
+    @cached_property
+    def _funcs(self):
+        """
+        "func|" display items bound once per request rather than looked up for every row.
         """
-        return list(map(self._getattr_info, self.get_display_items()))
+        return {fi.attr_name: self.getattr(fi.attr_name) for fi in self._item_info if fi.is_func}
 
     def get_display_items(self):
         """
@@ -321,30 +857,29 @@ class ItemDisplayMixin(FormatMixin, RichViewMixin):
         """
         return self.display_items
 
-    def _getattr_info(self, attr_name):
+    def _getattr_info(self, attr_name, field_names=None):
         """
         Finds the values for each item returned by _item_info.
 
         :param attr_name: value direct from display_items
+        :param field_names: names of the model's fields, found from the model if not supplied
         :return: FieldInfo instance
         """
         field_info = FieldInfo(attr_name)
 
         if field_info.is_func:
-            field_info.verbose_name = field_info.verbose_name or self.get_sub_attr(field_info.attr_name)
+            if not field_info.verbose_name:
+                field_info.verbose_name = self.get_sub_attr(field_info.attr_name, raw=True)
+                field_info.format_verbose_name = bool(field_info.verbose_name)
             field_info.verbose_name = field_info.verbose_name or field_info.attr_name
-            field_info.help_text = field_info.help_text or self.get_sub_attr(field_info.attr_name, 'help_text')
+            if not field_info.help_text:
+                field_info.help_text = self.get_sub_attr(field_info.attr_name, 'help_text', raw=True)
+                field_info.format_help_text = bool(field_info.help_text)
             return field_info
 
-        model, meta, field_names = self.model, self._meta, self._field_names
-        attr_name_part = None
-        for attr_name_part in self._split_attr_name(field_info.attr_name):
-            if attr_name_part in field_names:
-                field_info.field = meta.get_field_by_name(attr_name_part)[0]
-                if field_info.field.rel:
-                    model = field_info.field.rel.to
-                    meta = model._meta
-                    field_names = [f.name for f in meta.fields]
+        if field_names is None:
+            field_names = [f.name for f in self._meta.fields]
+        model, attr_name_part, is_m2m = self._resolve_fields(field_info, field_names)
 
         self._find_verbose_name(field_info, model, attr_name_part)
         self._find_help_text(field_info, model, attr_name_part)
@@ -352,29 +887,89 @@ class ItemDisplayMixin(FormatMixin, RichViewMixin):
         # make TextFields "long"
         if field_info.is_long is None and isinstance(field_info.field, models.TextField):
             field_info.is_long = True
+        is_method = inspect.isfunction(getattr(model, attr_name_part, None))
+        field_info.get_value = self._compile_accessor(field_info.attr_name, is_m2m, is_method)
+        field_info.value_type = self._find_value_type(field_info, model, attr_name_part, is_m2m)
         return field_info
 
+    @staticmethod
+    def _find_value_type(field_info, model, attr_name_part, is_m2m):
+        """
+        Find the type of an attribute's values either from the type of its field or a "value_type" property of
+        the attribute (like short_description), None if it's unknown.
+        """
+        field = field_info.field
+        if field is not None and field.name == attr_name_part and not is_m2m:
+            for field_types, value_type in FIELD_VALUE_TYPES:
+                if isinstance(field, field_types):
+                    return value_type
+        else:
+            return getattr(getattr(model, attr_name_part, None), 'value_type', None)
+
+    def _resolve_fields(self, field_info, field_names):
+        """
+        Walk through the parts of an attribute name finding its field and the select_related, prefetch_related
+        and column lookups required to get it.
+
+        :return: tuple of (model holding the attribute, last part of the attribute name, is many to many field)
+        """
+        model, meta = self.model, self._meta
+        m2m_names = [f.name for f in meta.many_to_many]
+        # path: field names leading to the attribute, rel_depth: how many of them are foreign keys
+        attr_name_part, path, rel_depth, is_field_path, is_m2m = None, [], 0, True, False
+        attr_name_parts = self._split_attr_name(field_info.attr_name)
+        for attr_name_part in attr_name_parts:
+            if attr_name_part in field_names:
+                field_info.field = meta.get_field_by_name(attr_name_part)[0]
+                if is_field_path:
+                    path.append(attr_name_part)
+                    rel_depth = len(path) if field_info.field.rel else rel_depth
+                if field_info.field.rel:
+                    model = field_info.field.rel.to
+                    field_info.related_models.append(model)
+                    meta = model._meta
+                    field_names = [f.name for f in meta.fields]
+                    m2m_names = [f.name for f in meta.many_to_many]
+            elif attr_name_part in m2m_names and attr_name_part == attr_name_parts[-1]:
+                field_info.field = meta.get_field_by_name(attr_name_part)[0]
+                field_info.related_models.append(field_info.field.rel.to)
+                if is_field_path:
+                    field_info.prefetch_related = '__'.join(path + [attr_name_part])
+                    is_m2m = True
+            else:
+                is_field_path = False
+
+        if rel_depth:
+            field_info.select_related = '__'.join(path[:rel_depth])
+        if path:
+            field_info.column = '__'.join(path)
+        return model, attr_name_part, is_m2m
+
     def _find_verbose_name(self, field_info, model, attr_name_part):
         # find verbose name if it's None so far
         if field_info.verbose_name is None:
             # priority_short_description has priority over field.verbose_name even when it's on a related model
-            field_info.verbose_name = self.get_sub_attr(attr_name_part, model, 'priority_short_description')
+            field_info.verbose_name = self.get_sub_attr(attr_name_part, model, 'priority_short_description', raw=True)
+            field_info.format_verbose_name = bool(field_info.verbose_name)
             if not field_info.verbose_name:
                 if field_info.field:
                     field_info.verbose_name = field_info.field.verbose_name
                 else:
-                    field_info.verbose_name = self.get_sub_attr(attr_name_part, model)
+                    field_info.verbose_name = self.get_sub_attr(attr_name_part, model, raw=True)
+                    field_info.format_verbose_name = bool(field_info.verbose_name)
                 if not field_info.verbose_name:
                     field_info.verbose_name = field_info.attr_name
 
     def _find_help_text(self, field_info, model, attr_name_part):
         if field_info.help_text is None:
-            field_info.help_text = self.get_sub_attr(attr_name_part, model, 'priority_help_text')
+            field_info.help_text = self.get_sub_attr(attr_name_part, model, 'priority_help_text', raw=True)
+            field_info.format_help_text = bool(field_info.help_text)
             if not field_info.help_text:
                 if field_info.field:
                     field_info.help_text = field_info.field.help_text
                 else:
-                    field_info.help_text = self.get_sub_attr(attr_name_part, model, 'help_text')
+                    field_info.help_text = self.get_sub_attr(attr_name_part, model, 'help_text', raw=True)
+                    field_info.format_help_text = bool(field_info.help_text)
 
     @staticmethod
     def _split_attr_name(attr_name):
@@ -383,40 +978,88 @@ class ItemDisplayMixin(FormatMixin, RichViewMixin):
         """
         return attr_name.replace('__', '.').split('.')
 
+    @classmethod
+    def _compile_accessor(cls, attr_name, is_m2m=False, is_method=False):
+        """
+        Build a function equivalent to _get_object_value for attr_name so names needn't be split for each row.
+
+        If the attribute is a many to many field the accessor returns the related queryset so prefetched
+        objects are used, if it's a method of the model the accessor returns the result of calling it.
+        """
+        getters = [operator.attrgetter(b) for b in cls._split_attr_name(attr_name)]
+        if is_m2m:
+            getters.append(lambda manager: manager.all())
+        elif is_method:
+            getters.append(lambda method: method())
+        if len(getters) == 1:
+            getter = getters[0]
+            return lambda obj: getter(obj) if obj else obj
+
+        def get_value(obj):
+            for getter in getters:
+                if obj:
+                    obj = getter(obj)
+            return obj
+        return get_value
+
     def _display_value(self, obj, field_info):
         """
         Generates a value for an attribute, optionally generate it's url and make it a link and returns it
         together with with it's verbose name.
 
-        If the attribute name refers to a function the value is returned raw (after reversing if rev_view_name,
-        otherwise it's processed by convert_to_string.
-
         :param obj: any instance of the model to get the value from.
         :param field_info: is FieldInfo below
-        :return: tuple containing (verbose_name, help_text, value)
+        :return: dict with keys: name, value, help_text and extra
+        """
+        name, help_text = self._item_labels[field_info.attr_name]
+        return {
+            'name': name,
+            'value': self._item_value(obj, field_info),
+            'help_text': help_text,
+            'extra': field_info.extra,
+        }
+
+    @cached_property
+    def _item_labels(self):
+        """
+        Verbose names and help texts of display items found once per request, those from short_descriptions
+        and help_texts of functions and attributes are formatted with label_ctx in the current language.
+        :return: dict of {attr_name: (verbose name, help text)}
+        """
+        label_ctx = self.label_ctx
+        labels = {}
+        for fi in self._item_info:
+            name, help_text = fi.verbose_name, fi.help_text
+            if fi.format_verbose_name:
+                name = str(name).format(**label_ctx)
+            if fi.format_help_text:
+                help_text = str(help_text).format(**label_ctx)
+            labels[fi.attr_name] = name, help_text
+        return labels
+
+    def _item_value(self, obj, field_info):
+        """
+        Find the value of a display item for obj, if the item refers to a function the value is returned raw
+        (after reversing if rev_view_name), otherwise it's processed by the column's formatter.
         """
         if field_info.is_func:
-            value = self.getattr(field_info.attr_name)(obj)
+            value = self._funcs[field_info.attr_name](obj)
         else:
-            value = self._get_object_value(obj, field_info.attr_name)
+            value = field_info.get_value(obj)
         url = None
-        if field_info.detail_view_link:
+        if not self.link_values:
+            pass
+        elif field_info.detail_view_link:
             url = self.get_detail_url(obj)
         elif field_info.rev_view_name and hasattr(value, 'pk'):
             url = self.get_rev_url(field_info.rev_view_name, value)
 
         if not field_info.is_func:
-            value = self.format_value(value, field_info.field)
+            value = self._formatters[field_info.attr_name](value)
 
         if url:
             value = mark_safe('<a href="%s">%s</a>' % (url, escape(value)))
-
-        return {
-            'name': field_info.verbose_name,
-            'value': value,
-            'help_text': field_info.help_text or None,
-            'extra': self.extra_field_info.get(field_info.attr_name, {})
-        }
+        return value
 
     def _get_object_value(self, obj, attr_name):
         """
@@ -433,6 +1076,25 @@ class ItemDisplayMixin(FormatMixin, RichViewMixin):
         return obj
 
 
+class ButtonInfo(object):
+    """
+    A compiled button, see RichViewMixin._compile_buttons. Compiled buttons are shared between requests
+    and shouldn't be modified once compiled.
+    """
+    __slots__ = ('data', 'text', 'url', 'url_func', 'rev_view_name', 'dropdown', 'dropdown_func')
+
+    def __init__(self, data):
+        #: the button as defined, copied for each request with "url", "text" and "dropdown" replaced
+        self.data = data
+        #: short_description of a string button, formatted on each request since it may include the object
+        self.text = None
+        self.url = None
+        self.url_func = None
+        self.rev_view_name = None
+        self.dropdown = None
+        self.dropdown_func = None
+
+
 class FieldInfo(object):
     """
     Simple namespace for information about fields.
@@ -441,19 +1103,37 @@ class FieldInfo(object):
     attr_name: the attribute name from display_items
     verbose_name: the verbose name of that field
     help_text: help text for this field, None if not supplied
+    format_verbose_name, format_help_text: whether verbose_name and help_text are short_descriptions or
+      help_texts to format with the view's label_ctx on each request
     rev_view_name: view name to reverse to get item url, None if no reverse link
     is_long: boolean indicating if the field should be considered "long"
+    select_related: lookup to select_related to get this attribute, None if it's not on a related model
+    column: lookup of the field holding this attribute for use with QuerySet.only(), None if it's unknown
+    prefetch_related: lookup to prefetch_related to get this attribute, None if it's not a many to many field
+    value_type: type of the attribute's values if known in advance, used to choose a formatter
+    extra: entry from extra_field_info for this attribute
+    get_value: function taking an instance of the model and returning the attribute's value
+    related_models: models of the related objects traversed to get the attribute
     """
     field = None
     verbose_name = None
     help_text = None
+    format_verbose_name = False
+    format_help_text = False
     rev_view_name = None
     detail_view_link = False
     is_long = None
     is_func = False
+    select_related = None
+    prefetch_related = None
+    column = None
+    value_type = None
+    extra = None
+    get_value = None
 
     def __init__(self, attr_name):
         self.attr_name = attr_name
+        self.related_models = []
         if isinstance(self.attr_name, tuple):
             if len(self.attr_name) == 2:
                 self.verbose_name, self.attr_name = self.attr_name
@@ -491,9 +1171,196 @@ class GetAttrMixin:
 
 
 class RichListViewMixin(GetAttrMixin, ItemDisplayMixin):
+    #: list of (name, text) for actions which can be applied to selected rows, see RichController.bulk_actions
+    bulk_actions = []
+
+    #: whether table rows are rendered by render_rows rather than a macro in the template
+    native_rows = False
+
+    @cached_property
+    def _row_columns(self):
+        """
+        Short display items with the opening tag of their cells, found once per request for render_row.
+        """
+        return [(fi, '<td class="{}">'.format(markup_escape(fi.extra.get('css', ''))))
+                for fi in self._item_info if not fi.is_long]
+
+    def render_row(self, obj):
+        """
+        Render the table row for obj, equivalent to the "table_row" macro in crud/table_list.jinja and escaped
+        in the same way as jinja's autoescape.
+        """
+        html = ['<tr>']
+        if self.bulk_actions:
+            html.append('<td><input type="checkbox" name="pk" value="{}"></td>'.format(markup_escape(obj.pk)))
+        item_value = self._item_value
+        for field_info, td in self._row_columns:
+            html += td, markup_escape(item_value(obj, field_info)), '</td>'
+        if not self._row_columns:
+            html.append('<td><a href="{}">{}</a></td>'.format(markup_escape(self.get_detail_url(obj)),
+                                                              markup_escape(obj)))
+        html.append('</tr>')
+        return Markup(''.join(html))
+
+    def render_rows(self, object_list, row_cache=None):
+        """
+        Render the rows of the table with render_row as one safe string, rows are taken from row_cache if given.
+        """
+        render_row = self.render_row
+        if row_cache:
+            return Markup('\n'.join(row_cache.render(obj, render_row) for obj in object_list))
+        return Markup('\n'.join(map(render_row, object_list)))
+
     def get_detail_url(self, obj):
         return self.ctrl.relative_url('details/{}'.format(obj.pk))
 
+    def get_context_data(self, **kwargs):
+        if self.search_fields:
+            kwargs['search_form'] = SearchForm(self.request.GET)
+        if self.list_filters:
+            kwargs['facets'] = self.get_facets()
+        get_without_page = self.request.GET.copy()
+        for key in ('page', 'cursor'):
+            get_without_page.pop(key, None)
+        kwargs['get_without_page'] = get_without_page
+        return super(RichListViewMixin, self).get_context_data(**kwargs)
+
+
+class Echo:
+    """
+    File-like object which returns what's written to it, used to stream csv.
+    """
+    def write(self, value):
+        return value
+
+
+# noinspection PyMethodMayBeStatic
+class RichExportViewMixin(GetAttrMixin, ItemDisplayMixin):
+    """
+    Stream display_items of every object in the queryset as CSV.
+
+    Objects are fetched chunk_size at a time with KeysetPaginator so memory use doesn't depend on the number of
+    objects, formatters are overridden to give text rather than HTML.
+    """
+    chunk_size = 2000
+    link_values = False
+
+    def fmt_none_empty(self, value):
+        return ''
+
+    def fmt_email_field(self, value):
+        return value
+
+    def fmt_url_field(self, value):
+        return value
+
+    def fmt_bool(self, value):
+        return ugettext('yes') if value else ugettext('no')
+
+    def gen_export(self, queryset):
+        writer = csv.writer(Echo())
+        yield writer.writerow([str(self._item_labels[fi.attr_name][0]) for fi in self._item_info])
+        for page in KeysetPaginator(queryset, self.chunk_size).iter_pages():
+            for obj in page.object_list:
+                yield writer.writerow([str(self._display_value(obj, fi)['value']) for fi in self._item_info])
+
+
+class RichBulkViewMixin(GetAttrMixin, ItemDisplayMixin):
+    """
+    Apply a bulk action to the objects selected on the list view. When "select_all" is posted the action
+    applies to every object in the list as filtered by the search and list_filters GET parameters, which the
+    list view's form posts to this view.
+    """
+    def get_queryset(self):
+        # skip ordering, select_related etc. from ItemDisplayMixin.get_queryset, they're not required
+        queryset = super(ItemDisplayMixin, self).get_queryset()
+        if self.request.POST.get('select_all'):
+            queryset = self.filter_queryset(queryset)
+        return queryset
+
+
+class JsonDisplayMixin(ItemDisplayMixin):
+    """
+    Render display_items as JSON rather than HTML.
+
+    Values are left as python types for the json encoder rather than formatted, except model instances
+    which are converted to strings. Keys are the attribute names from display_items, "?fields=a,b" limits
+    the attributes included. If there are no display_items all the model's fields are included.
+
+    The response's data is built by get_json_data(context, columns) which JsonListViewMixin and
+    JsonDetailViewMixin define.
+    """
+    def get_context_data(self, **kwargs):
+        # buttons and titles aren't required, skip RichViewMixin.get_context_data
+        return super(RichViewMixin, self).get_context_data(**kwargs)
+
+    def get_display_items(self):
+        return super(JsonDisplayMixin, self).get_display_items() or [f.name for f in self._meta.fields]
+
+    def get_json_columns(self):
+        """
+        :return: list of (key, get value function) tuples for each attribute to include
+        """
+        columns = self._item_info
+        fields = self.request.GET.get('fields')
+        if fields:
+            fields = fields.split(',')
+            unknown = set(fields) - {fi.attr_name for fi in columns}
+            if unknown:
+                raise AttrCrudError('unknown fields: {}'.format(', '.join(sorted(unknown))))
+            columns = [fi for fi in columns if fi.attr_name in fields]
+        return [(fi.attr_name, self._funcs[fi.attr_name] if fi.is_func else fi.get_value) for fi in columns]
+
+    def json_row(self, obj, columns):
+        return OrderedDict((key, self.json_value(get_value(obj))) for key, get_value in columns)
+
+    def json_value(self, value):
+        if callable(value):
+            value = value()
+        if isinstance(value, models.Model):
+            return str(value)
+        elif isinstance(value, (list, tuple, QuerySet)):
+            return [self.json_value(v) for v in value]
+        elif isinstance(value, Promise):
+            return str(value)
+        return value
+
+    def render_to_response(self, context, **response_kwargs):
+        try:
+            columns = self.get_json_columns()
+        except AttrCrudError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        return JsonResponse(self.get_json_data(context, columns), **response_kwargs)
+
+
+class JsonListViewMixin(GetAttrMixin, JsonDisplayMixin):
+    def get_json_data(self, context, columns):
+        page = context.get('page_obj')
+        previous_url = next_url = None
+        if page and page.has_previous():
+            previous_url = self._page_url(page, -1)
+        if page and page.has_next():
+            next_url = self._page_url(page, 1)
+        return OrderedDict([
+            ('count', context['paginator'].count if page else len(context['object_list'])),
+            ('next', next_url),
+            ('previous', previous_url),
+            ('results', [self.json_row(obj, columns) for obj in context['object_list']]),
+        ])
+
+    def _page_url(self, page, step):
+        get_args = self.request.GET.copy()
+        if self.pagination == 'keyset':
+            get_args['cursor'] = page.next_cursor if step > 0 else page.previous_cursor
+        else:
+            get_args[self.page_kwarg] = page.number + step
+        return '{}?{}'.format(self.request.path, get_args.urlencode())
+
+
+class JsonDetailViewMixin(GetAttrMixin, JsonDisplayMixin):
+    def get_json_data(self, context, columns):
+        return self.json_row(context['object'], columns)
+
 
 class RichDetailViewMixin(GetAttrMixin, ItemDisplayMixin):
     title = _('{object}')
@@ -509,3 +1376,179 @@ class RichUpdateViewMixin(RichViewMixin):
 
 class RichDeleteViewMixin(RichViewMixin):
     title = _('Delete {verbose_name}')
+
+
+class ImportResult:
+    """
+    Outcome of importing a CSV file: the number of objects created and the errors of invalid rows.
+
+    errors is a list of (line number, {field name: [messages]}) limited to max_errors, invalid counts every
+    invalid row.
+    """
+    def __init__(self, max_errors):
+        self.max_errors = max_errors
+        self.created = 0
+        self.invalid = 0
+        self.errors = []
+
+    def add_error(self, line, errors):
+        self.invalid += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, errors))
+
+
+# noinspection PyMethodMayBeStatic
+class RichImportViewMixin(RichViewMixin):
+    """
+    Create objects from the rows of a CSV file whose header names the model's fields.
+
+    The file is read a line at a time and valid objects are created batch_size at a time with bulk_create, each
+    batch in its own transaction; invalid rows are reported without stopping the import. bulk_create doesn't
+    call save() or send signals and many to many fields aren't set.
+    """
+    title = _('Import {verbose_name_plural}')
+
+    #: number of objects created by each bulk_create query
+    batch_size = 1000
+
+    #: how rows are validated: "form" to use the controller's form_factory() or "fields" to clean each value
+    #: with its model field, this is much faster but skips form and model clean methods, unique checks and
+    #: checking related objects exist
+    validation = 'form'
+
+    #: maximum number of row errors to report
+    max_errors = 100
+
+    encoding = 'utf-8-sig'
+
+    def import_csv(self, csv_file):
+        """
+        Import csv_file, a ValidationError is raised if the file's header is wrong or can't be read.
+
+        If a later line can't be decoded or parsed the rows before it are still imported and the error is
+        reported for that line since the rest of the file can't be read.
+        :return: ImportResult
+        """
+        rows = csv.DictReader(codecs.iterdecode(csv_file, self.encoding))
+        try:
+            fieldnames = rows.fieldnames or []
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise ValidationError(self.read_error_message(e))
+        validate = self.get_row_validator(fieldnames)
+        result = ImportResult(self.max_errors)
+        batch = []
+        try:
+            for row in rows:
+                obj, errors = validate(row)
+                if errors:
+                    result.add_error(rows.line_num, errors)
+                    continue
+                batch.append((rows.line_num, obj))
+                if len(batch) >= self.batch_size:
+                    self.create_batch(batch, result)
+                    batch = []
+        except (UnicodeDecodeError, csv.Error) as e:
+            # the line which failed isn't counted by the reader
+            result.add_error(rows.line_num + 1, {NON_FIELD_ERRORS: [self.read_error_message(e)]})
+        self.create_batch(batch, result)
+        if result.created:
+            self.ctrl.objects_changed(created=result.created)
+            # bulk_create doesn't send signals
+            invalidate_rows(self.model)
+        return result
+
+    def read_error_message(self, exc):
+        if isinstance(exc, UnicodeDecodeError):
+            return _('File is not valid %s, the rest of the file was not imported') % self.encoding
+        return _('Invalid CSV (%s), the rest of the file was not imported') % exc
+
+    def create_batch(self, batch, result):
+        """
+        Create the objects in batch, a list of (line number, object). If the batch fails each object is
+        created separately to find which rows are at fault.
+        """
+        if not batch:
+            return
+        manager = self.model._default_manager
+        try:
+            with transaction.atomic():
+                manager.bulk_create([obj for line, obj in batch])
+        except IntegrityError:
+            for line, obj in batch:
+                try:
+                    with transaction.atomic():
+                        manager.bulk_create([obj])
+                except IntegrityError as e:
+                    result.add_error(line, {NON_FIELD_ERRORS: [str(e)]})
+                else:
+                    result.created += 1
+        else:
+            result.created += len(batch)
+
+    def get_row_validator(self, fieldnames):
+        """
+        Check the header and return a function taking a row and returning (object, None) if it's valid
+        or (None, errors) if not.
+        """
+        if self.validation == 'form':
+            return self._form_validator(fieldnames)
+        elif self.validation == 'fields':
+            return self._fields_validator(fieldnames)
+        raise SetupCrudError('validation should be "form" or "fields", not {!r}'.format(self.validation))
+
+    def _form_validator(self, fieldnames):
+        form_class = self.ctrl.form_factory()
+        missing = [name for name, f in form_class.base_fields.items() if f.required and name not in fieldnames]
+        if missing:
+            raise ValidationError(_('Required columns missing: %s') % ', '.join(missing))
+
+        def validate(row):
+            form = form_class(data=row)
+            if form.is_valid():
+                return form.save(commit=False), None
+            return None, form.errors
+        return validate
+
+    def _fields_validator(self, fieldnames):
+        fields = self._get_import_fields(fieldnames)
+
+        def validate(row):
+            values, errors = {}, {}
+            for field in fields:
+                try:
+                    values[field.attname] = self.clean_field(field, row[field.name])
+                except ValidationError as e:
+                    errors[field.name] = e.messages
+            if errors:
+                return None, errors
+            return self.model(**values), None
+        return validate
+
+    def _get_import_fields(self, fieldnames):
+        meta = self.model._meta
+        fields = []
+        for name in fieldnames:
+            try:
+                field = meta.get_field(name)
+            except FieldDoesNotExist:
+                field = None
+            if field is None or not field.concrete or field.many_to_many:
+                raise ValidationError(_('Unknown column: %s') % name)
+            fields.append(field)
+        missing = [f.name for f in meta.concrete_fields if not (f.blank or f.has_default() or f in fields)]
+        if missing:
+            raise ValidationError(_('Required columns missing: %s') % ', '.join(missing))
+        return fields
+
+    def clean_field(self, field, value):
+        """
+        Convert and validate one value, unlike Field.clean this doesn't check related objects exist.
+        """
+        if value in (None, '') and field.blank:
+            if field.has_default():
+                return field.get_default()
+            return None if field.null else ''
+        value = field.to_python(value)
+        models.Field.validate(field, value, None)
+        field.run_validators(value)
+        return value
@@ -0,0 +1,123 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+
+def version_key(model, pk=None):
+    """
+    Cache key of the version of a model's rows, with pk for one object, without for all objects of the model
+    (used when the model is reached through a relation).
+    """
+    key = 'crud-row-version:{}.{}'.format(model._meta.app_label, model._meta.model_name)
+    return key if pk is None else '{}:{}'.format(key, pk)
+
+
+def _new_version():
+    return uuid.uuid4().hex[:12]
+
+
+def get_versions(keys):
+    """
+    Get versions from the cache, missing versions are replaced by new ones since rows may have been cached with
+    versions which were since evicted.
+    """
+    versions = cache.get_many(keys)
+    missing = {k: _new_version() for k in keys if k not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return versions
+
+
+def invalidate_rows(model, pks=()):
+    """
+    Invalidate cached rows showing the objects of model with primary keys pks and rows of other models
+    showing any object of model. Call this after changes which don't send signals eg. QuerySet.update().
+
+    Versions are deleted rather than replaced, get_versions gives them new values, so invalidating objects
+    which aren't shown in any cached rows doesn't fill the cache.
+    """
+    cache.delete_many([version_key(model)] + [version_key(model, pk) for pk in pks])
+
+
+def _object_changed(sender, instance, **kwargs):
+    invalidate_rows(sender, [instance.pk])
+
+
+def _m2m_changed(sender, instance, model, **kwargs):
+    invalidate_rows(instance.__class__, [instance.pk])
+    invalidate_rows(model)
+
+
+def row_cache_enabled():
+    return getattr(settings, 'CRUD_ROW_CACHE', False)
+
+
+def connect_signals():
+    """
+    Connect post_save, post_delete and m2m_changed of every model to invalidate rows when objects change.
+
+    This is called by CrudConfig.ready() if settings.CRUD_ROW_CACHE is set so changes made by any process using
+    django_crud (other web workers, shells, task queues) invalidate rows, not just processes which have rendered
+    a cached list. It's opt-in since every save then costs a cache call.
+    """
+    post_save.connect(_object_changed, weak=False, dispatch_uid='crud-row-cache')
+    post_delete.connect(_object_changed, weak=False, dispatch_uid='crud-row-cache')
+    m2m_changed.connect(_m2m_changed, weak=False, dispatch_uid='crud-row-cache')
+
+
+class RowCache:
+    """
+    Cache of rendered rows for one page of a list view.
+
+    Each row's key is made from the view's row_cache_prefix, the language, the object's primary key and
+    row_version_field together with versions of the object and of the related models the display items
+    traverse; those versions are replaced when post_save, post_delete or m2m_changed fire (see connect_signals,
+    django_crud must be in INSTALLED_APPS and settings.CRUD_ROW_CACHE set). Changes which don't send signals
+    (eg. QuerySet.update()) are only seen if they change row_version_field or after row_cache_timeout. Values
+    of "func|" items and model methods aren't tracked.
+    """
+    def __init__(self, view, object_list):
+        self.view = view
+        self.timeout = view.row_cache_timeout
+        model = view.model
+        related_models = view.get_row_cache_models()
+
+        objects = list(object_list)
+        version_keys = [version_key(m) for m in related_models] + [version_key(model, obj.pk) for obj in objects]
+        versions = get_versions(version_keys)
+        shared = [view.get_row_cache_prefix(), get_language()] + [versions[version_key(m)] for m in related_models]
+
+        self._keys = {}
+        for obj in objects:
+            parts = shared + [obj.pk, versions[version_key(model, obj.pk)]]
+            if view.row_version_field:
+                parts.append(getattr(obj, view.row_version_field))
+            raw_key = ':'.join(str(p) for p in parts)
+            self._keys[obj.pk] = 'crud-row:' + hashlib.md5(raw_key.encode()).hexdigest()
+        self._rows = cache.get_many(list(self._keys.values()))
+        self._new_rows = {}
+
+    def render(self, obj, render_row):
+        """
+        Return the cached row for obj or render it with render_row(obj) and remember it for save.
+        """
+        key = self._keys[obj.pk]
+        row = self._rows.get(key)
+        if row is None:
+            row = self._new_rows[key] = str(render_row(obj))
+        return mark_safe(row)
+
+    def save(self):
+        """
+        Store newly rendered rows, returns an empty string so it can be called from templates.
+        """
+        if self._new_rows:
+            cache.set_many(self._new_rows, self.timeout)
+            self._new_rows = {}
+        return ''
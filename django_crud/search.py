@@ -0,0 +1,156 @@
+from functools import reduce
+import hashlib
+import operator
+
+from django.db import connections
+from django.db.backends.utils import truncate_name
+from django.db.models import Q
+
+from .exceptions import SetupCrudError
+
+#: whether the index for (database alias, table, fields) exists, found once per process
+_index_exists = {}
+
+
+class SearchBackend:
+    """
+    Search fields of a model for each word of a query.
+
+    Where the database has a full text index of the fields (see create_search_index) it's used, otherwise
+    or if any of the fields are on related models they're searched with icontains. Backends for databases
+    supporting an index override find_index and create_index and define filter_index.
+    """
+    def __init__(self, model, fields, using='default'):
+        self.model = model
+        self.fields = list(fields)
+        self.using = using
+        self.connection = connections[using]
+        self.table = model._meta.db_table
+        # the index name includes a hash of the fields so an index of other fields isn't used
+        fields_hash = hashlib.md5(','.join(self.fields).encode()).hexdigest()[:8]
+        self.index_name = truncate_name('crud_search_{}_{}'.format(self.table, fields_hash),
+                                        self.connection.ops.max_name_length())
+
+    def filter(self, queryset, query):
+        if self.index_exists():
+            return self.filter_index(queryset, query)
+        return self.filter_icontains(queryset, query)
+
+    def filter_icontains(self, queryset, query):
+        for term in query.split():
+            queryset = queryset.filter(reduce(operator.or_, (Q(**{f + '__icontains': term}) for f in self.fields)))
+        return queryset
+
+    @property
+    def indexable(self):
+        return all('__' not in f for f in self.fields)
+
+    def index_exists(self):
+        if not self.indexable:
+            return False
+        key = self.using, self.table, tuple(self.fields)
+        exists = _index_exists.get(key)
+        if exists is None:
+            exists = _index_exists[key] = self.find_index()
+        return exists
+
+    def find_index(self):
+        return False
+
+    def create_index(self):
+        raise SetupCrudError('full text indexes are not supported by the {} backend'.format(self.connection.vendor))
+
+    def execute(self, *statements):
+        with self.connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+        _index_exists.pop((self.using, self.table, tuple(self.fields)), None)
+
+    def columns(self):
+        qn = self.connection.ops.quote_name
+        return [qn(self.model._meta.get_field(f).column) for f in self.fields]
+
+
+class SqliteSearchBackend(SearchBackend):
+    """
+    Search an FTS5 table with the model's table as its external content, triggers keep it up to date.
+    """
+    def filter_index(self, queryset, query):
+        qn = self.connection.ops.quote_name
+        pk = qn(self.model._meta.pk.column)
+        # quote each term so it's not interpreted as FTS syntax, "*" matches terms starting with it
+        match = ' '.join('"{}"*'.format(term.replace('"', '""')) for term in query.split())
+        where = '{}.{} IN (SELECT rowid FROM {} WHERE {} MATCH %s)'.format(
+            qn(self.table), pk, qn(self.index_name), qn(self.index_name))
+        return queryset.extra(where=[where], params=[match])
+
+    def find_index(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [self.index_name])
+            return cursor.fetchone() is not None
+
+    def create_index(self):
+        qn = self.connection.ops.quote_name
+        fts, table, pk = qn(self.index_name), qn(self.table), qn(self.model._meta.pk.column)
+        cols = ', '.join(self.columns())
+        new = ', '.join('new.' + c for c in self.columns())
+        old = ', '.join('old.' + c for c in self.columns())
+        delete = "INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.{pk}, {old});"
+        insert = 'INSERT INTO {fts}(rowid, {cols}) VALUES (new.{pk}, {new});'
+        ctx = dict(fts=fts, table=table, pk=pk, cols=cols, new=new, old=old,
+                   trigger={s: qn(self.index_name + '_' + s) for s in ('ai', 'ad', 'au')})
+        self.execute(*(sql.format(**ctx) for sql in [
+            "CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content={table}, content_rowid={pk})",
+            'CREATE TRIGGER {trigger[ai]} AFTER INSERT ON {table} BEGIN ' + insert + ' END',
+            'CREATE TRIGGER {trigger[ad]} AFTER DELETE ON {table} BEGIN ' + delete + ' END',
+            'CREATE TRIGGER {trigger[au]} AFTER UPDATE ON {table} BEGIN ' + delete + ' ' + insert + ' END',
+            "INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+        ]))
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Search a tsvector of the fields, a GIN index on the same expression makes this fast.
+    """
+    #: text search configuration, "simple" doesn't stem words or drop stop words
+    config = 'simple'
+
+    def document(self):
+        return "to_tsvector('{}', {})".format(self.config, " || ' ' || ".join(
+            "coalesce({}::text, '')".format(c) for c in self.columns()))
+
+    def filter_index(self, queryset, query):
+        where = "{} @@ plainto_tsquery('{}', %s)".format(self.document(), self.config)
+        return queryset.extra(where=[where], params=[query])
+
+    def find_index(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute('SELECT 1 FROM pg_indexes WHERE indexname = %s', [self.index_name])
+            return cursor.fetchone() is not None
+
+    def create_index(self):
+        qn = self.connection.ops.quote_name
+        self.execute('CREATE INDEX {} ON {} USING GIN ({})'.format(
+            qn(self.index_name), qn(self.table), self.document()))
+
+
+SEARCH_BACKENDS = {
+    'sqlite': SqliteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend(model, fields, using='default'):
+    backend_cls = SEARCH_BACKENDS.get(connections[using].vendor, SearchBackend)
+    return backend_cls(model, fields, using)
+
+
+def create_search_index(model, fields, using='default'):
+    """
+    Create the full text index for searching fields of model, eg. in a migration. Fields must be on the
+    model itself.
+
+    The index is kept up to date by the database (with triggers on SQLite) so changes which don't send
+    signals, eg. QuerySet.update() and bulk_create(), are included.
+    """
+    get_search_backend(model, fields, using).create_index()
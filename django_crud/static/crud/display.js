@@ -1,3 +1,6 @@
 $(document).ready(function(){
   $('[data-toggle="tooltip"]').tooltip();
+  $('.bulk-actions .select-all').change(function(){
+    $(this).closest('table').find('input[name="pk"]').prop('checked', this.checked);
+  });
 });
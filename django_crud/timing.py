@@ -0,0 +1,150 @@
+import logging
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connections
+from django.dispatch import Signal
+from django.template.response import TemplateResponse
+
+logger = logging.getLogger('django')
+
+#: sent with the ServerTiming of each timed request once its response is complete
+server_timing = Signal(providing_args=['request', 'view', 'timing'])
+
+
+def server_timing_enabled():
+    return getattr(settings, 'CRUD_SERVER_TIMING', False)
+
+
+class _Phase:
+    __slots__ = ('timing', 'name', 'start')
+
+    def __init__(self, timing, name):
+        self.timing, self.name = timing, name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *args):
+        self.timing.add(self.name, time.perf_counter() - self.start)
+
+
+class _NoPhase:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *args):
+        pass
+
+
+NO_PHASE = _NoPhase()
+
+
+def timing_phase(view, name):
+    """
+    Context manager timing a phase of the view's request, it does nothing if the request isn't timed.
+    """
+    timing = getattr(view, 'timing', None)
+    return timing.phase(name) if timing else NO_PHASE
+
+
+class ServerTiming:
+    """
+    Durations of the phases of one request, reported in the "Server-Timing" header.
+
+    Queries are counted and timed by enabling the debug cursor of each database connection for the request.
+    Phases may overlap, eg. "render" includes "formatting" and queries run while rendering.
+    """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations = OrderedDict()
+        self.queries = 0
+        self.finished = False
+        self._connections = []
+        for connection in connections.all():
+            self._connections.append((connection, connection.force_debug_cursor, len(connection.queries_log)))
+            connection.force_debug_cursor = True
+
+    def add(self, name, duration):
+        self.durations[name] = self.durations.get(name, 0) + duration
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def timed(self, name, func):
+        """
+        Wrap func so the time spent in it is added to the phase name.
+        """
+        add, perf_counter = self.add, time.perf_counter
+
+        def timed_func(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add(name, perf_counter() - start)
+        return timed_func
+
+    def finish(self):
+        """
+        Count and time the queries made since the start of the request and restore the connections' debug
+        cursor setting, later calls do nothing.
+        """
+        if self.finished:
+            return
+        self.finished = True
+        db_time = 0
+        for connection, force_debug_cursor, start in self._connections:
+            queries = list(connection.queries_log)[start:]
+            self.queries += len(queries)
+            db_time += sum(float(q['time']) for q in queries)
+            connection.force_debug_cursor = force_debug_cursor
+        self._connections = []
+        self.durations['db'] = db_time
+        self.durations['total'] = time.perf_counter() - self.start
+
+    def header(self):
+        parts = []
+        for name, duration in self.durations.items():
+            part = '{};dur={:.2f}'.format(name, duration * 1000)
+            if name == 'db':
+                part += ';desc="{} queries"'.format(self.queries)
+            parts.append(part)
+        return ', '.join(parts)
+
+    def complete(self, response, request, view):
+        """
+        Add the Server-Timing header to response once it's rendered, send server_timing and log the timing.
+        """
+        def add_header(rendered_response):
+            self.finish()
+            header = self.header()
+            rendered_response['Server-Timing'] = header
+            server_timing.send(sender=view.__class__, request=request, view=view, timing=self)
+            logger.debug('%s %s: %s', request.method, request.path, header)
+
+        if isinstance(response, TimedTemplateResponse) and not response.is_rendered:
+            response.add_post_render_callback(add_header)
+        else:
+            add_header(response)
+        return response
+
+
+class TimedTemplateResponse(TemplateResponse):
+    """
+    TemplateResponse which adds the time taken to render it to the "render" phase of timing.
+
+    timing is finished once the content is rendered, even if rendering fails, so the connections' debug cursor
+    setting is always restored.
+    """
+    timing = None
+
+    @property
+    def rendered_content(self):
+        try:
+            with timing_phase(self, 'render'):
+                return super(TimedTemplateResponse, self).rendered_content
+        finally:
+            if self.timing:
+                self.timing.finish()
@@ -1,5 +1,8 @@
 import os
 
+from django_jinja.builtins import DEFAULT_EXTENSIONS
+from django_crud.jinja import crud_bytecode_cache
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 SECRET_KEY = 'u8v$^dl83qyl(kd057u7_gbh4sz__-xq&dp5j6f^6m5v1jl-$w'
@@ -53,7 +56,9 @@ TEMPLATES = [
             'match_extension': '.jinja',
             'trim_blocks': True,
             'lstrip_blocks': True,
-            'context_processors': context_processors
+            'context_processors': context_processors,
+            'bytecode_cache': crud_bytecode_cache(),
+            'extensions': DEFAULT_EXTENSIONS + ['django_crud.jinja.TrimWhitespaceExtension'],
         },
     },
     {
@@ -14,6 +14,9 @@ class TeamController(RichController):
         'owner',
         'home_town',
     ]
+    list_filters = [
+        'home_town',
+    ]
 
     detail_display_items = [
         'name',
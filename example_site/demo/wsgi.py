@@ -2,6 +2,11 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from django_crud.jinja import precompile_templates
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'demo.settings')
 
 application = get_wsgi_application()
+
+# compile crud templates before the first request, they're saved to the bytecode cache for other workers
+precompile_templates()
@@ -17,3 +17,34 @@ class Article(models.Model):
 class Section(models.Model):
     article = models.ForeignKey(Article, on_delete=models.PROTECT)
     text = models.TextField(null=True)
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=30)
+    articles = models.ManyToManyField(Article, blank=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Report(models.Model):
+    title = models.CharField(max_length=30)
+    modified = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.title
+
+
+class Event(models.Model):
+    KINDS = (
+        ('tk', 'Talk'),
+        ('ws', 'Workshop'),
+    )
+    title = models.CharField(max_length=30)
+    kind = models.CharField(max_length=2, choices=KINDS)
+    article = models.ForeignKey(Article, null=True, blank=True)
+    public = models.BooleanField(default=False)
+    date = models.DateField()
+
+    def __str__(self):
+        return self.title
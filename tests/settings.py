@@ -47,6 +47,7 @@ TEMPLATES = [
 ]
 
 BASE_TEMPLATE = 'base.jinja'
+CRUD_ROW_CACHE = True
 
 DATABASES = {
     'default': {
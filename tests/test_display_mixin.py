@@ -1,5 +1,7 @@
+from django.utils import translation
+from django.utils.translation import ugettext_lazy
 from django_crud.rich_views import ItemDisplayMixin
-from .models import Article
+from .models import Article, Section, Tag
 
 
 def test_basic():
@@ -75,3 +77,117 @@ def test_text_field_short():
     art = Article(body='__body__')
     assert list(dm.gen_short_props(art)) == [{'extra': {}, 'help_text': None, 'name': 'body', 'value': '__body__'}]
     assert list(dm.gen_long_props(art)) == []
+
+
+def test_display_plan_shared(mocker):
+    class DM(ItemDisplayMixin):
+        model = Article
+        display_items = ['title', 'func|show_title']
+
+        def show_title(self, obj):
+            return obj.title
+
+    spy = mocker.spy(DM, '_getattr_info')
+    dm1, dm2 = DM(), DM()
+    assert dm1._item_info is dm2._item_info
+    assert spy.call_count == 2
+    art = Article(title='__title__')
+    assert list(dm1.gen_short_props(art)) == list(dm2.gen_short_props(art))
+
+
+def test_display_plan_related():
+    class DM(ItemDisplayMixin):
+        model = Section
+        display_items = ['article__title', 'article.slug']
+
+    dm = DM()
+    sec = Section(article=Article(title='__title__', slug='__slug__'))
+    assert [p['value'] for p in dm.gen_short_props(sec)] == ['__title__', '__slug__']
+    assert [p['name'] for p in dm.gen_short_props(sec)] == ['title', 'slug']
+
+
+def test_related_lookups():
+    class DM(ItemDisplayMixin):
+        model = Section
+        display_items = ['text', 'article', 'article__title', 'func|foo']
+
+        def foo(self, obj):
+            return 1
+
+    dm = DM()
+    assert dm.get_select_related() == ['article']
+    assert dm.get_prefetch_related() == []
+
+    class DM2(ItemDisplayMixin):
+        model = Tag
+        display_items = ['name', 'articles']
+    dm = DM2()
+    assert dm.get_select_related() == []
+    assert dm.get_prefetch_related() == ['articles']
+
+
+def test_only_columns():
+    class DM(ItemDisplayMixin):
+        model = Section
+        display_items = ['article__title', 'func|foo', 'text.upper']
+        extra_columns = ['article__slug']
+
+        def foo(self, obj):
+            return 1
+
+    assert DM().get_only_columns() == ['id', 'article__slug', 'article__title', 'text']
+
+    class DM2(ItemDisplayMixin):
+        model = Section
+        display_items = ['article', 'text']
+    assert DM2().get_only_columns() == ['id', 'article', 'text']
+
+    class DM3(ItemDisplayMixin):
+        model = Section
+        display_items = ['text']
+        select_related = ['article']
+    assert DM3().get_only_columns() == ['id', 'text', 'article']
+
+
+def test_get_columns():
+    class DM(ItemDisplayMixin):
+        model = Article
+        display_items = ['title', 'body', 'func|expensive']
+        extra_field_info = {'title': {'css': 'wide'}}
+
+        def expensive(self, obj):
+            raise AssertionError('objects should not be evaluated')
+        expensive.short_description = 'Expensive'
+
+    assert DM().get_columns() == [
+        {'attr_name': 'title', 'name': 'title', 'help_text': 'the title of the article', 'extra': {'css': 'wide'},
+         'css': 'wide', 'is_long': False, 'is_func': False, 'sortable': True},
+        {'attr_name': 'body', 'name': 'body', 'help_text': None, 'extra': {}, 'css': '', 'is_long': True,
+         'is_func': False, 'sortable': True},
+        {'attr_name': 'expensive', 'name': 'Expensive', 'help_text': None, 'extra': {}, 'css': '', 'is_long': False,
+         'is_func': True, 'sortable': False},
+    ]
+
+
+def test_short_description_translated_per_request():
+    class DM(ItemDisplayMixin):
+        model = Article
+        display_items = ['func|published', 'func|count']
+
+        def published(self, obj):
+            return True
+        published.short_description = ugettext_lazy('Yes')
+
+        def count(self, obj):
+            return 1
+        count.short_description = 'Number of {verbose_name_plural}'
+
+    names = {}
+    for language in ('en', 'de', 'fr'):
+        with translation.override(language):
+            names[language] = [p['name'] for p in DM().gen_short_props(Article())]
+    assert names == {
+        'en': ['Yes', 'Number of Articles'],
+        'de': ['Ja', 'Number of Articles'],
+        'fr': ['Oui', 'Number of Articles'],
+    }
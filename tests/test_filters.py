@@ -0,0 +1,123 @@
+import datetime
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from django_crud.controllers import RichController
+from django_crud.exceptions import SetupCrudError
+from django_crud.filters import (get_list_filter, ChoicesFilter, ForeignKeyFilter, BooleanFilter, DateRangeFilter,
+                                 count_facet_values)
+from .models import Article, Event, Report
+from .test_rich_controllers import assert_contains
+
+
+@pytest.fixture
+def events(db):
+    a1 = Article.objects.create(title='first', body='x')
+    a2 = Article.objects.create(title='second', body='x')
+    return [
+        Event.objects.create(title='e1', kind='tk', article=a1, public=True, date=datetime.date(2016, 1, 1)),
+        Event.objects.create(title='e2', kind='tk', article=a2, public=False, date=datetime.date(2016, 2, 1)),
+        Event.objects.create(title='e3', kind='ws', article=a1, public=True, date=datetime.date(2016, 3, 1)),
+        Event.objects.create(title='e4', kind='tk', article=None, public=True, date=datetime.date(2016, 3, 2)),
+    ]
+
+
+@pytest.mark.parametrize('lookup,filter_cls', [
+    ('kind', ChoicesFilter),
+    ('article', ForeignKeyFilter),
+    ('public', BooleanFilter),
+    ('date', DateRangeFilter),
+    ('article__title', None),
+])
+def test_get_list_filter(lookup, filter_cls):
+    if filter_cls is None:
+        with pytest.raises(SetupCrudError):
+            get_list_filter(Event, lookup)
+    else:
+        list_filter = get_list_filter(Event, lookup)
+        assert list_filter.__class__ == filter_cls
+        assert list_filter.verbose_name == lookup
+
+
+def test_count_values(events):
+    qs = Event.objects.order_by('title')
+    with CaptureQueriesContext(connection) as ctx:
+        assert sorted(get_list_filter(Event, 'kind').count_values(qs)) == [('tk', 3), ('ws', 1)]
+    assert len(ctx) == 1
+    assert 'GROUP BY' in ctx[0]['sql']
+    counts = dict(get_list_filter(Event, 'article').count_values(qs))
+    assert counts == {events[0].article_id: 2, events[1].article_id: 1, None: 1}
+    label_filter = ForeignKeyFilter('article', label_field='title').bind(Event)
+    assert sorted(label_filter.get_options(label_filter.count_values(qs))) == [
+        (events[0].article_id, 'first'), (events[1].article_id, 'second')]
+
+
+def test_count_facet_values_cached(events):
+    cache.clear()
+    list_filter = get_list_filter(Event, 'kind')
+    qs = Event.objects.filter(public=True)
+    assert sorted(count_facet_values(list_filter, qs, 60)) == [('tk', 2), ('ws', 1)]
+    Event.objects.create(title='e5', kind='ws', public=True, date=datetime.date(2016, 1, 1))
+    with CaptureQueriesContext(connection) as ctx:
+        assert sorted(count_facet_values(list_filter, qs, 60)) == [('tk', 2), ('ws', 1)]
+    assert len(ctx) == 0
+    # another combination of filters has it's own counts
+    assert sorted(count_facet_values(list_filter, Event.objects.all(), 60)) == [('tk', 3), ('ws', 2)]
+    cache.clear()
+
+
+class EventController(RichController):
+    model = Event
+    list_display_items = ['title']
+    order_by = 'title',
+    list_filters = ['kind', 'article', 'public', 'date']
+
+
+def list_titles(http_request, query):
+    views, _, _ = EventController.as_views('test')
+    r = views[0].callback(http_request('/event/list/' + query))
+    r.render()
+    return [e.title for e in r.context_data['object_list']], r
+
+
+def test_filter_list(events, http_request):
+    assert list_titles(http_request, '')[0] == ['e1', 'e2', 'e3', 'e4']
+    assert list_titles(http_request, '?kind=tk')[0] == ['e1', 'e2', 'e4']
+    assert list_titles(http_request, '?kind=tk&public=True')[0] == ['e1', 'e4']
+    assert list_titles(http_request, '?article={}'.format(events[0].article_id))[0] == ['e1', 'e3']
+    assert list_titles(http_request, '?date__gte=2016-02-01&date__lte=2016-03-01')[0] == ['e2', 'e3']
+    # invalid values are ignored
+    assert list_titles(http_request, '?article=x&date__gte=x')[0] == ['e1', 'e2', 'e3', 'e4']
+
+
+def test_datetime_range(db):
+    report = Report.objects.create(title='r')
+    today = report.modified.date()
+    list_filter = get_list_filter(Report, 'modified')
+    assert list(list_filter.filter(Report.objects.all(), (today, today))) == [report]
+    assert list(list_filter.filter(Report.objects.all(), (None, today - datetime.timedelta(days=1)))) == []
+
+
+def test_facets(events, http_request):
+    with CaptureQueriesContext(connection) as ctx:
+        titles, r = list_titles(http_request, '?kind=tk&page=1')
+    # one grouped query for each filter with options plus one for labels of foreign keys
+    assert sum('GROUP BY' in q['sql'] for q in ctx) == 3
+    facets = {f['lookup']: f for f in r.context_data['facets']}
+    kind = facets['kind']['options']
+    # counts for the kind filter ignore the kind filtered by
+    assert [(o['label'], o['count'], o['selected']) for o in kind] == [('Talk', 3, True), ('Workshop', 1, False)]
+    assert kind[0]['url'] == '?'
+    assert kind[1]['url'] == '?kind=ws'
+    public = facets['public']['options']
+    assert [(o['label'], o['count']) for o in public] == [('Yes', 2), ('No', 1)]
+    assert public[0]['url'] == '?kind=tk&public=True'
+    article = facets['article']['options']
+    assert [(o['label'], o['count']) for o in article] == [('first', 1), ('second', 1)]
+    assert facets['date']['options'] is None
+    assert_contains(r, '<a href="?kind=ws">Workshop</a> <span class="badge">1</span>')
+    assert_contains(r, '<input type="hidden" name="kind" value="tk">')
+    assert_contains(r, '<input type="date" name="date__gte" value="" class="form-control">')
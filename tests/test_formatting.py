@@ -2,8 +2,10 @@ import datetime
 from decimal import Decimal
 import pytest
 
-from django_crud.rich_views import FormatMixin
+from django_crud.rich_views import FormatMixin, ItemDisplayMixin
 from django.db import models
+from django.test import override_settings
+from django.utils import numberformat, translation
 
 
 @pytest.fixture
@@ -66,3 +68,97 @@ def test_time():
 
 def test_str():
     assert FormatMixin().format_value('hello') == 'hello'
+
+
+def test_none_no_print(capsys):
+    assert FormatMixin().format_value(None) == '&mdash;'
+    assert capsys.readouterr() == ('', '')
+
+
+def test_callable_formatted():
+    assert FormatMixin().format_value(lambda: 123) == '123'
+    assert FormatMixin().format_value(lambda: None) == '&mdash;'
+
+
+class FormatThing(models.Model):
+    name = models.CharField(max_length=10)
+    email = models.EmailField()
+    active = models.BooleanField(default=False)
+    created = models.DateTimeField()
+    day = models.DateField()
+    count = models.IntegerField(choices=[(1, 'one'), (2, 'two')])
+    score = models.DecimalField(max_digits=5, decimal_places=2)
+
+    def total(self):
+        return Decimal('1234')
+    total.value_type = Decimal
+
+    class Meta:
+        app_label = 'tests'
+
+
+def test_column_formatters(mocker):
+    class DM(ItemDisplayMixin):
+        model = FormatThing
+        display_items = ['name', 'email', 'active', 'created', 'day', 'count', 'score', 'total', 'name.upper']
+
+    dm = DM()
+    value_types = [str, str, bool, datetime.datetime, datetime.date, int, Decimal, Decimal, None]
+    assert [fi.value_type for fi in dm._item_info] == value_types
+    thing = FormatThing(name='foo', email='x@example.com', active=True, created=datetime.datetime(2015, 4, 3, 13, 47),
+                        day=datetime.date(2015, 4, 3), count=2, score=Decimal('1.50'))
+    format_value = mocker.spy(dm, 'format_value')
+    assert [p['value'] for p in dm.gen_short_props(thing)] == [
+        'foo',
+        '<a href="mailto:x@example.com" target="blank">x@example.com</a>',
+        '<span class="glyphicon glyphicon-ok bool"></span>',
+        'April 3, 2015, 1:47 p.m.',
+        'April 3, 2015',
+        'two',
+        '1.50',
+        '1234',
+        'FOO',
+    ]
+    # only "name.upper" of unknown type needs the generic formatter
+    assert format_value.call_count == 1
+
+
+def test_column_formatters_fallback():
+    class DM(ItemDisplayMixin):
+        model = FormatThing
+        display_items = ['name', 'day', 'count']
+
+    dm = DM()
+    thing = FormatThing(name='', day=datetime.datetime(2015, 4, 3, 13, 47), count=None)
+    assert [p['value'] for p in dm.gen_short_props(thing)] == ['&mdash;', 'April 3, 2015, 1:47 p.m.', '&mdash;']
+    thing = FormatThing(name=123, day=None, count=3)
+    assert [p['value'] for p in dm.gen_short_props(thing)] == ['123', '&mdash;', 3]
+
+
+def test_locale_formatter_cache(mocker):
+    fm = FormatMixin()
+    number_format = mocker.spy(numberformat, 'format')
+    assert [fm.fmt_number(v) for v in (123, 123, 123.0, Decimal('1.5'), Decimal('1.50'))] == \
+        ['123', '123', '123.0', '1.5', '1.50']
+    assert number_format.call_count == 4
+    assert fm.locale_formatter is fm.locale_formatter
+
+
+def test_locale_formatter_size():
+    fm = FormatMixin()
+    fm.format_cache_size = 3
+    for i in range(5):
+        fm.fmt_number(i)
+    assert len(fm.locale_formatter._cache) == 3
+
+
+@override_settings(USE_L10N=True, USE_THOUSAND_SEPARATOR=True)
+def test_locale_formatter_language():
+    fm = FormatMixin()
+    with translation.override('en'):
+        assert fm.fmt_number(Decimal('1234.5')) == '1,234.5'
+        assert fm.fmt_date(datetime.date(2015, 4, 3)) == 'April 3, 2015'
+    with translation.override('de'):
+        assert fm.fmt_number(Decimal('1234.5')) == '1.234,5'
+        assert fm.fmt_date(datetime.date(2015, 4, 3)) == '3. April 2015'
+        assert fm.fmt_time(datetime.time(13, 47)) == '13:47'
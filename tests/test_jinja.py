@@ -0,0 +1,46 @@
+import os
+
+from jinja2 import DictLoader, Environment
+
+from django_crud.jinja import crud_bytecode_cache, precompile_templates, trim_whitespace, TrimWhitespaceExtension
+
+TEMPLATE = '<ul>\n  {% for i in items %}\n    <li>\n      {{ i }}\n    </li>\n  {% endfor %}\n</ul>\n'
+
+
+def test_trim_whitespace():
+    assert trim_whitespace(' <a>\n\t  <b>x y</b>\n\n  </a>') == '<a>\n<b>x y</b>\n\n</a>'
+
+
+def trim_env():
+    return Environment(loader=DictLoader({'crud/list.jinja': TEMPLATE, 'other.jinja': TEMPLATE}),
+                       extensions=[TrimWhitespaceExtension], trim_blocks=True, lstrip_blocks=True)
+
+
+def test_trim_extension():
+    env = trim_env()
+    assert env.get_template('crud/list.jinja').render(items=[1]) == '<ul>\n<li>\n1\n</li>\n</ul>'
+    assert env.get_template('other.jinja').render(items=[1]) == '<ul>\n    <li>\n      1\n    </li>\n</ul>'
+    env = trim_env()
+    env.trim_all_templates = True
+    assert env.get_template('other.jinja').render(items=[1]) == '<ul>\n<li>\n1\n</li>\n</ul>'
+
+
+def test_bytecode_cache(tmpdir):
+    cache_dir = str(tmpdir.join('jinja'))
+    loader = DictLoader({'crud/list.jinja': TEMPLATE})
+    env = Environment(loader=loader, bytecode_cache=crud_bytecode_cache(cache_dir))
+    assert precompile_templates(environments=[env]) == ['crud/list.jinja']
+    files = os.listdir(cache_dir)
+    assert len(files) == 1
+    assert files[0].startswith('crud_jinja_')
+
+    env2 = Environment(loader=loader, bytecode_cache=crud_bytecode_cache(cache_dir))
+    assert '<li>' in env2.get_template('crud/list.jinja').render(items=[1])
+    assert os.listdir(cache_dir) == files
+
+
+def test_precompile_engine_templates():
+    names = precompile_templates()
+    assert 'crud/table_list.jinja' in names
+    assert 'crud/macros.jinja' in names
+    assert all(n.startswith('crud/') for n in names)
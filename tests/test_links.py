@@ -0,0 +1,74 @@
+import pytest
+from django.core.urlresolvers import NoReverseMatch
+from django.test import override_settings
+
+from django_crud import links
+from django_crud.exceptions import ReverseCrudError
+from django_crud.links import reverse_object_url, SENTINEL_PK
+from django_crud.rich_views import ItemDisplayMixin
+from .models import Article, Section
+
+
+class Obj:
+    def __init__(self, pk):
+        self.pk = pk
+
+
+@pytest.yield_fixture
+def fake_reverse(mocker):
+    calls = []
+
+    def fake_reverse(viewname, args=None, kwargs=None):
+        calls.append((viewname, args))
+        if viewname == 'static' and not args:
+            return '/static-url/'
+        if viewname == 'item' and args:
+            return '/item/{}/x/'.format(args[0])
+        if viewname == 'slug' and args and not isinstance(args[0], int):
+            return '/slug/{}/'.format(args[0])
+        raise NoReverseMatch()
+    mocker.patch('django_crud.links.reverse', fake_reverse)
+    links._url_templates.clear()
+    yield calls
+    links._url_templates.clear()
+
+
+def test_static(fake_reverse):
+    assert reverse_object_url('static') == '/static-url/'
+    assert reverse_object_url('static', Obj(1)) == '/static-url/'
+    assert fake_reverse == [('static', None)]
+
+
+def test_pk_template(fake_reverse):
+    assert [reverse_object_url('item', Obj(pk)) for pk in (1, 2, 3)] == ['/item/1/x/', '/item/2/x/', '/item/3/x/']
+    assert fake_reverse == [('item', None), ('item', (SENTINEL_PK,))]
+    with pytest.raises(ReverseCrudError):
+        reverse_object_url('item')
+
+
+def test_no_template(fake_reverse):
+    assert reverse_object_url('slug', Obj('a')) == '/slug/a/'
+    assert reverse_object_url('slug', Obj('b')) == '/slug/b/'
+    assert reverse_object_url('slug', Obj('c')) == '/slug/c/'
+    # the template is only looked for once, later calls reverse with the pk directly
+    assert fake_reverse == [('slug', None), ('slug', (SENTINEL_PK,)), ('slug', ('a',)), ('slug', ('b',)),
+                            ('slug', ('c',))]
+    with pytest.raises(ReverseCrudError):
+        reverse_object_url('missing', Obj(1))
+
+
+def test_urlconf_changed(fake_reverse):
+    reverse_object_url('static')
+    with override_settings(ROOT_URLCONF='tests.settings'):
+        assert links._url_templates == {}
+
+
+def test_rev_display_item(fake_reverse, db):
+    article = Article.objects.create(title='a', body='x')
+    section = Section.objects.create(article=article, text='x')
+
+    class View(ItemDisplayMixin):
+        model = Section
+        display_items = ['rev|item|article']
+    value = [p['value'] for p in View().gen_short_props(section)]
+    assert value == ['<a href="/item/{}/x/">a</a>'.format(article.pk)]
@@ -0,0 +1,271 @@
+import pytest
+from django.core.cache import cache
+from django.core.paginator import InvalidPage, EmptyPage
+from django.db import connection
+from django.http import Http404
+from django.test.utils import CaptureQueriesContext
+
+from django_crud.controllers import RichController
+from django_crud.exceptions import SetupCrudError
+from django_crud.pagination import KeysetPaginator, HasNextPaginator, COUNT_STRATEGIES
+from .models import Article, Section, Event
+from .test_rich_controllers import assert_contains, assert_not_contains
+from .conftest import current_response
+
+
+@pytest.fixture
+def articles(db):
+    # titles repeat so the primary key tie breaker is required
+    return [Article.objects.create(title='title {}'.format(i // 2), body='x', slug='s%d' % i) for i in range(7)]
+
+
+def walk(paginator):
+    pages, page = [], paginator.page()
+    pages.append(page)
+    while page.has_next():
+        page = paginator.page(page.next_cursor)
+        pages.append(page)
+    return pages
+
+
+def test_keyset_forwards(articles):
+    paginator = KeysetPaginator(Article.objects.order_by('title'), 3)
+    pages = walk(paginator)
+    assert [[a.pk for a in p] for p in pages] == [[a.pk for a in articles[i:i + 3]] for i in (0, 3, 6)]
+    assert [(p.has_previous(), p.has_next()) for p in pages] == [(False, True), (True, True), (True, False)]
+    assert pages[0].previous_cursor is None
+    assert pages[-1].next_cursor is None
+
+
+def test_keyset_backwards(articles):
+    paginator = KeysetPaginator(Article.objects.order_by('-title'), 3)
+    pages = walk(paginator)
+    assert [a.pk for a in pages[0]] == [articles[6].pk, articles[4].pk, articles[5].pk]
+    page = paginator.page(pages[-1].previous_cursor)
+    assert list(page) == list(pages[1])
+    page = paginator.page(page.previous_cursor)
+    assert list(page) == list(pages[0])
+    assert not page.has_previous()
+    assert page.has_next()
+
+
+def test_keyset_related_ordering(db):
+    for i in range(4):
+        Section.objects.create(article=Article.objects.create(title='t', body='x'), text=str(i))
+    paginator = KeysetPaginator(Section.objects.order_by('-article'), 3)
+    assert [s.text for p in walk(paginator) for s in p] == ['3', '2', '1', '0']
+    paginator = KeysetPaginator(Section.objects.order_by('article__title', 'text'), 3)
+    assert [s.text for p in walk(paginator) for s in p] == ['0', '1', '2', '3']
+
+
+@pytest.fixture
+def events(db):
+    articles = [Article.objects.create(title='t', body='x') for _ in range(2)]
+    return [Event.objects.create(title=str(i), kind='tk', date='2016-01-01', article=article)
+            for i, article in enumerate([None, articles[1], None, articles[0], articles[1]])]
+
+
+@pytest.mark.parametrize('order, expected', [
+    ('article', ['3', '1', '4', '0', '2']),
+    ('-article', ['0', '2', '1', '4', '3']),
+    ('article__title', ['1', '3', '4', '0', '2']),
+])
+def test_keyset_nullable_ordering(events, order, expected):
+    paginator = KeysetPaginator(Event.objects.order_by(order), 2)
+    pages = walk(paginator)
+    assert [e.title for p in pages for e in p] == expected
+    assert [e.title for p in paginator.iter_pages() for e in p] == expected
+    page = paginator.page(pages[-1].previous_cursor)
+    assert list(page) == list(pages[-2])
+    page = paginator.page(page.previous_cursor)
+    assert list(page) == list(pages[0])
+    assert not page.has_previous()
+
+
+def test_keyset_empty(db):
+    page = KeysetPaginator(Article.objects.all(), 3).page()
+    assert list(page) == []
+    assert not page.has_other_pages()
+
+
+@pytest.mark.parametrize('cursor', ['x', 'WyJ4IiwxXQ', 'WyJuIiwxLDJd', 'WyJuIiwieCJd'])
+def test_keyset_invalid_cursor(db, cursor):
+    paginator = KeysetPaginator(Article.objects.all(), 3)
+    with pytest.raises(InvalidPage):
+        paginator.page(cursor)
+
+
+def test_keyset_random_ordering(db):
+    with pytest.raises(SetupCrudError):
+        KeysetPaginator(Article.objects.order_by('?'), 3)
+
+
+class KeysetArticleController(RichController):
+    model = Article
+    pagination = 'keyset'
+    list_display_items = ['link|title']
+
+
+def test_keyset_list_view(db, http_request):
+    articles = [Article.objects.create(title='article {}'.format(i), body='x') for i in range(25)]
+    views, _, _ = KeysetArticleController.as_views('test')
+    list_view = views[0]
+    r = list_view.callback(http_request('/article/list/'))
+    assert_contains(r, '<a href="/article/details/{}/">article 19</a>'.format(articles[19].pk))
+    assert_not_contains(r, 'article 20')
+    assert_not_contains(r, '?page=')
+    page_obj = current_response.context['page_obj']
+    assert_contains(r, '<li><a href="?cursor={}">&raquo;</a></li>'.format(page_obj.next_cursor))
+    r = list_view.callback(http_request('/article/list/?cursor={}'.format(page_obj.next_cursor)))
+    assert_contains(r, '<a href="/article/details/{}/">article 20</a>'.format(articles[20].pk))
+    assert_not_contains(r, 'article 19<')
+    with pytest.raises(Http404):
+        list_view.callback(http_request('/article/list/?cursor=x'))
+
+
+def test_keyset_prune_columns(db, http_request):
+    class PrunedKeysetController(KeysetArticleController):
+        prune_columns = True
+
+        def list_view_init_handler(self, view_cls):
+            super(PrunedKeysetController, self).list_view_init_handler(view_cls)
+            view_cls.order_by = '-slug',
+
+    for i in range(25):
+        Article.objects.create(title='article {}'.format(i), body='x', slug='s{:02}'.format(i))
+    views, _, _ = PrunedKeysetController.as_views('test')
+    with CaptureQueriesContext(connection) as ctx:
+        r = views[0].callback(http_request('/article/list/'))
+        r.render()
+    assert_contains(r, 'article 24')
+    assert_not_contains(r, 'article 4<')
+    assert current_response.context['page_obj'].next_cursor
+    # the cursor's slug is loaded with the page rather than deferred
+    assert len(ctx) == 1
+    assert '"tests_article"."body"' not in ctx[0]['sql']
+
+
+@pytest.yield_fixture
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_has_next_paginator(articles):
+    paginator = HasNextPaginator(Article.objects.order_by('pk'), 3)
+    assert paginator.count is None
+    page = paginator.page(1)
+    assert list(page) == articles[:3]
+    assert (page.has_previous(), page.has_next(), page.start_index(), page.end_index()) == (False, True, 1, 3)
+    page = paginator.page(3)
+    assert list(page) == articles[6:]
+    assert (page.has_previous(), page.has_next(), page.start_index(), page.end_index()) == (True, False, 7, 7)
+    with pytest.raises(EmptyPage):
+        paginator.page(4)
+    with pytest.raises(InvalidPage):
+        paginator.page('x')
+
+
+class View:
+    count_cache_timeout = 60
+    count_estimate_threshold = 1000
+
+
+@pytest.mark.parametrize('strategy,expected', [
+    ('exact', 7),
+    ('cached', 7),
+    ('estimate', 7),
+    ('counter', 7),
+    ('has_next', None),
+])
+def test_count_strategies(articles, clear_cache, strategy, expected):
+    assert COUNT_STRATEGIES[strategy](Article.objects.all(), View()) == expected
+    assert COUNT_STRATEGIES[strategy](Article.objects.filter(title='title 0'), View()) in (2, None)
+
+
+def test_cached_count(articles, clear_cache):
+    qs = Article.objects.all()
+    assert COUNT_STRATEGIES['cached'](qs, View()) == 7
+    Article.objects.create(title='another', body='x')
+    with CaptureQueriesContext(connection) as ctx:
+        assert COUNT_STRATEGIES['cached'](qs, View()) == 7
+    assert len(ctx) == 0
+    assert COUNT_STRATEGIES['cached'](qs.filter(pk__in=[]), View()) == 0
+
+
+class CounterArticleController(RichController):
+    model = Article
+    count_strategy = 'counter'
+
+
+def test_counter_count(db, http_request, clear_cache):
+    Article.objects.create(title='article 1', body='x')
+    views, _, _ = CounterArticleController.as_views('test')
+    views[0].callback(http_request('/article/list/')).render()
+    assert current_response.context['paginator'].count == 1
+
+    r = views[2].callback(http_request.post('/article/create/', {'title': 'article 2', 'body': 'x'}))
+    assert r.status_code == 302
+    with CaptureQueriesContext(connection) as ctx:
+        views[0].callback(http_request('/article/list/')).render()
+    assert current_response.context['paginator'].count == 2
+    assert not any('COUNT' in q['sql'] for q in ctx)
+
+    art = Article.objects.get(title='article 2')
+    views[4].callback(http_request.post('/article/delete/{}/'.format(art.pk)), pk=art.pk)
+    views[0].callback(http_request('/article/list/')).render()
+    assert current_response.context['paginator'].count == 1
+
+
+class HasNextArticleController(RichController):
+    model = Article
+    count_strategy = 'has_next'
+    order_by = 'pk',
+    list_display_items = ['link|title']
+
+
+def test_has_next_list_view(db, http_request):
+    for i in range(25):
+        Article.objects.create(title='article {}'.format(i), body='x')
+    views, _, _ = HasNextArticleController.as_views('test')
+    with CaptureQueriesContext(connection) as ctx:
+        r = views[0].callback(http_request('/article/list/'))
+        assert_contains(r, '<li><a href="?page=2">2</a></li>')
+    assert_contains(r, '<li><a href="?page=2">&rsaquo;</a></li>')
+    assert not any('COUNT' in q['sql'] for q in ctx)
+    r = views[0].callback(http_request('/article/list/?page=2'))
+    assert_contains(r, '<li><a href="?page=1">1</a></li>')
+    assert_contains(r, '<li class="disabled"><a>&rsaquo;</a></li>')
+    assert_not_contains(r, '?page=3')
+
+
+def test_invalid_count_strategy(db, http_request):
+    class WrongController(RichController):
+        model = Article
+        count_strategy = 'foobar'
+    views, _, _ = WrongController.as_views('test')
+    with pytest.raises(SetupCrudError):
+        views[0].callback(http_request('/article/list/'))
+
+
+class KeysetEventController(RichController):
+    model = Event
+    pagination = 'keyset'
+    paginate_by = 2
+    list_display_items = ['title', 'article']
+
+
+@pytest.mark.parametrize('order, expected', [
+    ('article', ['3', '1', '4', '0', '2']),
+    ('-article', ['2', '0', '4', '1', '3']),
+])
+def test_keyset_list_view_nullable_sort(events, http_request, order, expected):
+    list_view = KeysetEventController.as_views('test')[0][0]
+    titles, url = [], '/event/list/?o={}'.format(order)
+    while url:
+        list_view.callback(http_request(url)).render()
+        page_obj = current_response.context['page_obj']
+        titles += [e.title for e in page_obj]
+        url = page_obj.has_next() and '/event/list/?o={}&cursor={}'.format(order, page_obj.next_cursor)
+    assert titles == expected
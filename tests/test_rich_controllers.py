@@ -1,7 +1,15 @@
+import json
+import logging
 import re
 import pytest
-from django_crud.controllers import RichController
-from .models import Article, Section
+from django.contrib.messages import get_messages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django_crud.controllers import RichController, VanillaController
+from django_crud import rich_views
+from .models import Article, Section, Tag
 from .conftest import current_response
 
 
@@ -216,3 +224,574 @@ def test_delete_view_post_protected(db, views, http_request):
     assert_redirects(r, '/root/list/')
     assert Article.objects.count() == 1
     # TODO use proper urls and client to check messages
+
+
+class SectionController(RichController):
+    model = Section
+    list_display_items = [
+        'text',
+        'article',
+        'article__slug',
+    ]
+
+
+class TagController(RichController):
+    model = Tag
+    list_display_items = [
+        'name',
+        'articles',
+    ]
+
+
+def _list_query_count(controller, http_request):
+    views, _, _ = controller.as_views('test')
+    r = views[0].callback(http_request('/things/list/'))
+    with CaptureQueriesContext(connection) as ctx:
+        r.render()
+    return len(ctx)
+
+
+def test_list_select_related(db, http_request):
+    art = Article.objects.create(title='article 1', body='x', slug='article_1')
+    Section.objects.create(article=art, text='first')
+    first_count = _list_query_count(SectionController, http_request)
+    for i in range(5):
+        Section.objects.create(article=Article.objects.create(title='a %d' % i, body='x'), text='s %d' % i)
+    assert _list_query_count(SectionController, http_request) == first_count
+    views, _, _ = SectionController.as_views('test')
+    r = views[0].callback(http_request('/things/list/'))
+    assert_contains(r, '<td class="">\narticle 1\n</td>\n<td class="">\narticle_1\n</td>', html=True)
+
+
+def test_list_prefetch_related(db, http_request):
+    art1 = Article.objects.create(title='article 1', body='x')
+    art2 = Article.objects.create(title='article 2', body='x')
+    tag = Tag.objects.create(name='tag 1')
+    tag.articles.add(art1, art2)
+    first_count = _list_query_count(TagController, http_request)
+    for i in range(5):
+        Tag.objects.create(name='tag %d' % i).articles.add(art1)
+    assert _list_query_count(TagController, http_request) == first_count
+    views, _, _ = TagController.as_views('test')
+    r = views[0].callback(http_request('/things/list/'))
+    assert_contains(r, 'article 1, article 2')
+
+
+def test_list_select_related_override(db, http_request):
+    class NoSelectSectionController(SectionController):
+        select_related = []
+
+    art = Article.objects.create(title='article 1', body='x')
+    Section.objects.create(article=art, text='first')
+    Section.objects.create(article=art, text='second')
+    assert _list_query_count(NoSelectSectionController, http_request) > _list_query_count(SectionController,
+                                                                                          http_request)
+
+
+def test_list_prune_columns(db, http_request):
+    class PrunedSectionController(SectionController):
+        prune_columns = True
+        list_display_items = [
+            'article__title',
+            'article__slug',
+        ]
+
+    Section.objects.create(article=Article.objects.create(title='article 1', body='x', slug='a1'), text='first')
+    views, _, _ = PrunedSectionController.as_views('test')
+    r = views[0].callback(http_request('/things/list/'))
+    with CaptureQueriesContext(connection) as ctx:
+        r.render()
+    assert all('"tests_article"."body"' not in q['sql'] for q in ctx)
+    assert all('"tests_section"."text"' not in q['sql'] for q in ctx)
+    assert all('"tests_article"."slug"' in q['sql'] for q in ctx)
+    assert_contains(r, '<td class="">\narticle 1\n</td>\n<td class="">\na1\n</td>', html=True)
+
+
+class ExportSectionController(SectionController):
+    csv_export = True
+    export_chunk_size = 2
+    list_display_items = [
+        'link|text',
+        'article',
+        ('Slug', 'article__slug'),
+    ]
+
+
+def test_export_view(db, http_request):
+    art = Article.objects.create(title='article, 1', body='x', slug='a1')
+    for i in range(5):
+        Section.objects.create(article=art, text='section {}'.format(i))
+    Section.objects.create(article=Article.objects.create(title='article 2', body='x'))
+    views, _, _ = ExportSectionController.as_views('test')
+    assert views[5].name == 'test-export'
+    with CaptureQueriesContext(connection) as ctx:
+        r = views[5].callback(http_request('/sections/export/'))
+        assert r.streaming
+        content = b''.join(r.streaming_content).decode()
+    assert r['Content-Type'] == 'text/csv'
+    assert r['Content-Disposition'] == 'attachment; filename="sections.csv"'
+    assert content.split('\r\n') == [
+        'text,article,Slug',
+        'section 0,"article, 1",a1',
+        'section 1,"article, 1",a1',
+        'section 2,"article, 1",a1',
+        'section 3,"article, 1",a1',
+        'section 4,"article, 1",a1',
+        ',article 2,',
+        '',
+    ]
+    assert len(ctx) == 3
+
+
+@pytest.mark.parametrize('order', ['text', '-text'])
+def test_export_nullable_sort(db, http_request, order):
+    art = Article.objects.create(title='article 1', body='x', slug='a1')
+    for text in ['b', None, 'a', None, 'c']:
+        Section.objects.create(article=art, text=text)
+    views, _, _ = ExportSectionController.as_views('test')
+    r = views[5].callback(http_request('/sections/export/?o={}'.format(order)))
+    texts = [line.split(',')[0] for line in b''.join(r.streaming_content).decode().split('\r\n')[1:-1]]
+    expected = ['a', 'b', 'c', '', '']
+    assert texts == (expected if order == 'text' else expected[::-1])
+
+
+def test_export_disabled(db):
+    views, _, _ = SectionController.as_views('test')
+    assert len(views) == 5
+
+
+def test_export_button(db, http_request):
+    class ExportButtonSectionController(ExportSectionController):
+        list_view_buttons = ['func|export_button']
+    views, _, _ = ExportButtonSectionController.as_views('test')
+    r = views[0].callback(http_request('/sections/list/'))
+    assert_contains(r, '<a href="/sections/export/" class="btn btn-default ">Export sections</a>')
+
+
+class JsonTagController(TagController):
+    json_api = True
+    detail_display_items = [
+        'name',
+        'func|article_count',
+    ]
+
+    def article_count(self, obj):
+        return obj.articles.count()
+
+
+def test_json_list_view(db, http_request):
+    art1 = Article.objects.create(title='article 1', body='x')
+    art2 = Article.objects.create(title='article 2', body='x')
+    Tag.objects.create(name='tag 1').articles.add(art1, art2)
+    Tag.objects.create(name='tag 2')
+    views, _, _ = JsonTagController.as_views('test')
+    assert [v.name for v in views[5:]] == ['test-list-json', 'test-details-json']
+    r = views[5].callback(http_request('/tags/list.json'))
+    assert r['Content-Type'] == 'application/json'
+    assert json.loads(r.content.decode()) == {
+        'count': 2,
+        'next': None,
+        'previous': None,
+        'results': [
+            {'name': 'tag 1', 'articles': ['article 1', 'article 2']},
+            {'name': 'tag 2', 'articles': []},
+        ],
+    }
+    r = views[5].callback(http_request('/tags/list.json?fields=name'))
+    assert json.loads(r.content.decode())['results'] == [{'name': 'tag 1'}, {'name': 'tag 2'}]
+    r = views[5].callback(http_request('/tags/list.json?fields=name,foobar'))
+    assert r.status_code == 400
+    assert json.loads(r.content.decode()) == {'error': 'unknown fields: foobar'}
+
+
+def test_json_list_pagination(db, http_request):
+    for i in range(25):
+        Tag.objects.create(name='tag {}'.format(i))
+    views, _, _ = JsonTagController.as_views('test')
+    r = views[5].callback(http_request('/tags/list.json?fields=name'))
+    data = json.loads(r.content.decode())
+    assert data['count'] == 25
+    assert len(data['results']) == 20
+    assert data['next'] == '/tags/list.json?fields=name&page=2'
+    assert data['previous'] is None
+    r = views[5].callback(http_request(data['next']))
+    data = json.loads(r.content.decode())
+    assert [t['name'] for t in data['results']] == ['tag {}'.format(i) for i in range(20, 25)]
+    assert data['next'] is None
+    assert data['previous'] == '/tags/list.json?fields=name&page=1'
+
+
+def test_json_list_keyset_pagination(db, http_request):
+    class KeysetJsonTagController(JsonTagController):
+        pagination = 'keyset'
+
+    for i in range(25):
+        Tag.objects.create(name='tag {}'.format(i))
+    views, _, _ = KeysetJsonTagController.as_views('test')
+    r = views[5].callback(http_request('/tags/list.json?fields=name'))
+    data = json.loads(r.content.decode())
+    assert data['count'] is None
+    assert len(data['results']) == 20
+    assert data['previous'] is None
+    assert data['next'].startswith('/tags/list.json?')
+    r = views[5].callback(http_request(data['next']))
+    data = json.loads(r.content.decode())
+    assert [t['name'] for t in data['results']] == ['tag {}'.format(i) for i in range(20, 25)]
+    assert data['next'] is None
+    assert 'cursor=' in data['previous']
+
+
+def test_json_detail_view(db, http_request):
+    tag = Tag.objects.create(name='tag 1')
+    tag.articles.add(Article.objects.create(title='article 1', body='x'))
+    views, _, _ = JsonTagController.as_views('test')
+    r = views[6].callback(http_request('/tags/details/{}.json'.format(tag.pk)), pk=tag.pk)
+    assert json.loads(r.content.decode()) == {'name': 'tag 1', 'article_count': 1}
+
+
+def test_json_vanilla(db, http_request):
+    class JsonVanillaController(VanillaController):
+        model = Section
+        json_api = True
+
+    sec = Section.objects.create(article=Article.objects.create(title='article 1', body='x'), text='s')
+    views, _, _ = JsonVanillaController.as_views('test')
+    r = views[5].callback(http_request('/sections/list.json'))
+    assert json.loads(r.content.decode())['results'] == [{'id': sec.pk, 'article': 'article 1', 'text': 's'}]
+
+
+class BulkArticleController(RichController):
+    model = Article
+    list_display_items = ['title']
+    bulk_actions = [
+        'delete',
+        {'name': 'clear_slug', 'text': 'Clear slug', 'update': {'slug': ''}},
+        'func|retitle',
+        'func|retitle_and_delete',
+    ]
+    bulk_batch_size = 2
+
+    def retitle(self, queryset):
+        queryset.update(title='retitled')
+    retitle.short_description = 'Retitle {verbose_name_plural}'
+
+    def retitle_and_delete(self, queryset):
+        self.retitle(queryset)
+        queryset.delete()
+    retitle_and_delete.short_description = 'Retitle and delete {verbose_name_plural}'
+
+
+@pytest.fixture
+def bulk_views():
+    views, _, _ = BulkArticleController.as_views('test')
+    return {v.name: v.callback for v in views}
+
+
+def test_bulk_list(db, http_request, bulk_views):
+    article = Article.objects.create(title='first', body='x')
+    r = bulk_views['test-list'](http_request('/article/list/'))
+    assert_contains(r, '<form method="post" action="/article/bulk/" class="bulk-actions">')
+    assert_contains(r, '<input type="checkbox" name="pk" value="{}">'.format(article.pk))
+    assert_contains(r, '<option value="delete">Delete selected Articles</option>')
+    assert_contains(r, '<option value="clear_slug">Clear slug</option>')
+    assert_contains(r, '<option value="retitle">Retitle Articles</option>')
+
+
+def test_bulk_list_no_actions(db, http_request, views):
+    Article.objects.create(title='first', body='x')
+    r = views[0].callback(http_request('/article/list/'))
+    assert_not_contains(r, 'bulk-actions')
+    assert_not_contains(r, 'name="pk"')
+
+
+def test_bulk_delete(db, http_request, bulk_views):
+    articles = [Article.objects.create(title=str(i), body='x') for i in range(5)]
+    request = http_request.post('/article/bulk/', {'action': 'delete', 'pk': [a.pk for a in articles[:3]]})
+    with CaptureQueriesContext(connection) as ctx:
+        r = bulk_views['test-bulk'](request)
+    assert_redirects(r, '/article/list/')
+    # 3 objects in batches of 2
+    assert sum('DELETE FROM "tests_article"' in q['sql'] for q in ctx) == 2
+    assert list(Article.objects.values_list('title', flat=True)) == ['3', '4']
+    assert [str(m) for m in get_messages(request)] == ['3 Articles deleted']
+
+
+def test_bulk_delete_all(db, http_request, bulk_views):
+    for i in range(5):
+        Article.objects.create(title=str(i), body='x')
+    r = bulk_views['test-bulk'](http_request.post('/article/bulk/', {'action': 'delete', 'select_all': '1'}))
+    assert_redirects(r, '/article/list/')
+    assert Article.objects.count() == 0
+
+
+def test_bulk_delete_all_filtered(db, http_request):
+    class SearchBulkArticleController(BulkArticleController):
+        search_fields = ['title']
+
+    for title in ('keep', 'drop 1', 'drop 2'):
+        Article.objects.create(title=title, body='x')
+    views = {v.name: v.callback for v in SearchBulkArticleController.as_views('test')[0]}
+    r = views['test-list'](http_request('/article/list/?q=drop&page=1'))
+    assert_contains(r, '<form method="post" action="/article/bulk/?q=drop" class="bulk-actions">')
+    request = http_request.post('/article/bulk/?q=drop', {'action': 'delete', 'select_all': '1'})
+    assert_redirects(views['test-bulk'](request), '/article/list/')
+    assert list(Article.objects.values_list('title', flat=True)) == ['keep']
+
+
+def test_bulk_delete_protected(db, http_request, bulk_views):
+    articles = [Article.objects.create(title=str(i), body='x') for i in range(3)]
+    Section.objects.create(article=articles[2])
+    request = http_request.post('/article/bulk/', {'action': 'delete', 'pk': [a.pk for a in articles]})
+    assert_redirects(bulk_views['test-bulk'](request), '/article/list/')
+    assert Article.objects.count() == 3
+    assert [str(m) for m in get_messages(request)] == ['Sorry, some of these objects are in use so they cannot be '
+                                                       'deleted.']
+
+
+def test_bulk_update(db, http_request, bulk_views):
+    articles = [Article.objects.create(title=str(i), body='x', slug='s') for i in range(3)]
+    request = http_request.post('/article/bulk/', {'action': 'clear_slug', 'pk': [a.pk for a in articles[1:]]})
+    assert_redirects(bulk_views['test-bulk'](request), '/article/list/')
+    assert list(Article.objects.order_by('pk').values_list('slug', flat=True)) == ['s', '', '']
+    assert [str(m) for m in get_messages(request)] == ['2 Articles updated']
+
+
+def test_bulk_func(db, http_request, bulk_views):
+    articles = [Article.objects.create(title=str(i), body='x') for i in range(2)]
+    request = http_request.post('/article/bulk/', {'action': 'retitle', 'pk': [articles[0].pk]})
+    assert_redirects(bulk_views['test-bulk'](request), '/article/list/')
+    assert list(Article.objects.order_by('pk').values_list('title', flat=True)) == ['retitled', '1']
+
+
+def test_bulk_func_protected(db, http_request, bulk_views):
+    articles = [Article.objects.create(title=str(i), body='x') for i in range(2)]
+    Section.objects.create(article=articles[1])
+    request = http_request.post('/article/bulk/', {'action': 'retitle_and_delete', 'pk': [a.pk for a in articles]})
+    assert_redirects(bulk_views['test-bulk'](request), '/article/list/')
+    # the action's update is rolled back with the failed delete
+    assert list(Article.objects.order_by('pk').values_list('title', flat=True)) == ['0', '1']
+    assert [str(m) for m in get_messages(request)] == ['Sorry, some of these objects are in use so they cannot be '
+                                                       'deleted.']
+
+
+@pytest.mark.parametrize('data', [
+    {'action': 'foobar', 'pk': ['1']},
+    {'action': 'delete', 'pk': ['x']},
+])
+def test_bulk_bad_request(db, http_request, bulk_views, data):
+    assert bulk_views['test-bulk'](http_request.post('/article/bulk/', data)).status_code == 400
+
+
+class ImportArticleController(RichController):
+    model = Article
+    csv_import = True
+    import_batch_size = 2
+
+
+class FieldsImportArticleController(ImportArticleController):
+    import_validation = 'fields'
+
+
+def post_csv(ctrl_cls, http_request, content, encoding='utf-8'):
+    views, _, _ = ctrl_cls.as_views('test')
+    import_view = {v.name: v.callback for v in views}['test-import']
+    csv_file = SimpleUploadedFile('articles.csv', content.encode(encoding), content_type='text/csv')
+    r = import_view(http_request.post('/article/import/', {'file': csv_file}))
+    r.render()
+    return r
+
+
+@pytest.mark.parametrize('ctrl_cls', [ImportArticleController, FieldsImportArticleController])
+def test_import(db, http_request, ctrl_cls):
+    content = 'title,body,slug\nfirst,x,a\nsecond,"multi\nline",\n,x,\nfourth,x,not a slug\nfifth,x,e\n'
+    with CaptureQueriesContext(connection) as ctx:
+        r = post_csv(ctrl_cls, http_request, content)
+    assert r.status_code == 200
+    result = r.context_data['result']
+    assert (result.created, result.invalid) == (3, 2)
+    assert [line for line, errors in result.errors] == [5, 6]
+    assert list(result.errors[0][1]) == ['title']
+    assert list(result.errors[1][1]) == ['slug']
+    assert list(Article.objects.order_by('pk').values_list('title', 'body')) == [
+        ('first', 'x'), ('second', 'multi\nline'), ('fifth', 'x')]
+    assert sum('INSERT INTO "tests_article"' in q['sql'] for q in ctx) == 2
+    assert_contains(r, '3 Articles created, 2 invalid rows')
+
+
+@pytest.mark.parametrize('ctrl_cls', [ImportArticleController, FieldsImportArticleController])
+def test_import_missing_columns(db, http_request, ctrl_cls):
+    r = post_csv(ctrl_cls, http_request, 'slug\na\n')
+    assert r.status_code == 200
+    assert 'result' not in r.context_data
+    assert_contains(r, 'Required columns missing: title, body')
+    assert Article.objects.count() == 0
+
+
+@pytest.mark.parametrize('content, line', [
+    ('title,body\nfirst,x\nsecond,x\ncaf\xe9,x\nfourth,x\n', 4),
+    ('title,body\nfirst,x\nsecond,x\nnul\x00,x\nfourth,x\n', 4),
+])
+def test_import_unreadable_line(db, http_request, content, line):
+    r = post_csv(ImportArticleController, http_request, content, encoding='latin-1')
+    assert r.status_code == 200
+    result = r.context_data['result']
+    assert (result.created, result.invalid) == (2, 1)
+    assert result.errors[0][0] == line
+    assert 'the rest of the file was not imported' in result.errors[0][1]['__all__'][0]
+    assert list(Article.objects.values_list('title', flat=True)) == ['first', 'second']
+
+
+def test_import_unreadable_header(db, http_request):
+    r = post_csv(ImportArticleController, http_request, 'titl\xe9,body\na,b\n', encoding='latin-1')
+    assert r.status_code == 200
+    assert 'result' not in r.context_data
+    assert_contains(r, 'File is not valid utf-8-sig')
+    assert Article.objects.count() == 0
+
+
+def test_import_unknown_column(db, http_request):
+    r = post_csv(FieldsImportArticleController, http_request, 'title,body,foobar\na,b,c\n')
+    assert_contains(r, 'Unknown column: foobar')
+
+
+def test_import_button(db, http_request):
+    class ButtonController(ImportArticleController):
+        list_view_buttons = ['func|import_button']
+    views, _, _ = ButtonController.as_views('test')
+    r = views[0].callback(http_request('/article/list/'))
+    assert_contains(r, 'href="/article/import/"')
+    assert_contains(r, 'Import Articles')
+
+
+class SortArticleController(RichController):
+    model = Article
+    list_display_items = ['link|title', 'slug', 'func|shout']
+
+    def shout(self, obj):
+        return obj.title.upper()
+
+
+def sorted_titles(views, http_request, query):
+    r = views[0].callback(http_request('/article/list/' + query))
+    r.render()
+    return [a.title for a in r.context_data['object_list']], r
+
+
+def test_sort(db, http_request):
+    for title, slug in [('b', 'x'), ('a', 'z'), ('c', 'y'), ('a', 'w')]:
+        Article.objects.create(title=title, body='x', slug=slug)
+    views, _, _ = SortArticleController.as_views('test')
+    with CaptureQueriesContext(connection) as ctx:
+        titles, r = sorted_titles(views, http_request, '?o=title')
+    assert titles == ['a', 'a', 'b', 'c']
+    assert 'ORDER BY "tests_article"."title" ASC, "tests_article"."id" ASC' in ctx[-1]['sql']
+    assert_contains(r, '<th class=" sorted-asc">\n<a href="?o=-title">title</a>\n</th>', html=True)
+    assert_contains(r, '<a href="?o=slug">slug</a>')
+    assert_contains(r, '<th class="">\nshout\n</th>', html=True)
+
+    titles, r = sorted_titles(views, http_request, '?o=-title&page=1')
+    assert titles == ['c', 'b', 'a', 'a']
+    assert_contains(r, '<a href="?o=title">title</a>')
+
+    assert sorted_titles(views, http_request, '?o=-slug')[0] == ['a', 'c', 'b', 'a']
+    # func items can't be sorted by, the default ordering is used
+    assert sorted_titles(views, http_request, '?o=shout')[0] == ['b', 'a', 'c', 'a']
+
+
+def test_sort_whitelist(db, http_request):
+    class WhitelistController(SortArticleController):
+        sortable_items = ['slug']
+
+    for title, slug in [('b', 'x'), ('a', 'z')]:
+        Article.objects.create(title=title, body='x', slug=slug)
+    views, _, _ = WhitelistController.as_views('test')
+    titles, r = sorted_titles(views, http_request, '?o=title')
+    assert titles == ['b', 'a']
+    assert_not_contains(r, '?o=title')
+    assert_contains(r, '<a href="?o=slug">slug</a>')
+
+
+@override_settings(DEBUG=True)
+def test_sort_index_warning(db, http_request, caplog):
+    rich_views._checked_sort_indexes.clear()
+    views, _, _ = SortArticleController.as_views('test')
+    with caplog.at_level(logging.WARNING, logger='django'):
+        sorted_titles(views, http_request, '?o=slug')
+        assert not caplog.records
+        sorted_titles(views, http_request, '?o=title')
+    assert [r.getMessage() for r in caplog.records] == ['Article list sorted by "title" which has no index']
+
+
+def test_sort_related(db, http_request):
+    for title in 'bac':
+        Section.objects.create(article=Article.objects.create(title=title, body='x', slug=title), text=title)
+    views, _, _ = SectionController.as_views('test')
+    r = views[0].callback(http_request('/section/list/?o=-article__slug'))
+    r.render()
+    assert [s.text for s in r.context_data['object_list']] == ['c', 'b', 'a']
+    assert r.context_data['view'].get_sortable() == {
+        'article': 'article', 'article__slug': 'article__slug', 'text': 'text'}
+
+
+class NativeArticleController(BulkArticleController):
+    list_display_items = ['link|title', 'slug', 'func|shout']
+    extra_field_info = {'slug': {'css': 'x"y'}}
+    native_rows = True
+
+    def shout(self, obj):
+        return obj.title.upper()
+
+
+def tbody(r):
+    r.render()
+    content = r.content.decode()
+    content = content[content.index('<tbody>'):content.index('</tbody>')]
+    return re.sub(r'\s*\n\s*', '', content)
+
+
+@pytest.mark.parametrize('display_items', [NativeArticleController.list_display_items, []])
+def test_native_rows(db, http_request, display_items):
+    Article.objects.create(title='<b>bold</b> & co', body='x', slug='s')
+    Article.objects.create(title='second', body='x')
+
+    class NativeController(NativeArticleController):
+        list_display_items = display_items
+
+    class MacroController(NativeController):
+        native_rows = False
+    native_views, _, _ = NativeController.as_views('test')
+    macro_views, _, _ = MacroController.as_views('test')
+
+    native = tbody(native_views[0].callback(http_request('/article/list/')))
+    assert native == tbody(macro_views[0].callback(http_request('/article/list/')))
+    assert '&lt;b&gt;bold&lt;/b&gt; &amp; co' in native
+    assert '<b>' not in native
+
+
+def test_native_rows_cached(db, http_request):
+    class CachedController(NativeArticleController):
+        row_cache = True
+    Article.objects.create(title='first', body='x')
+    views, _, _ = CachedController.as_views('test')
+    first = tbody(views[0].callback(http_request('/article/list/')))
+    assert 'first' in first
+    Article.objects.filter(title='first').update(title='changed')
+    # the cached row is used
+    assert tbody(views[0].callback(http_request('/article/list/'))) == first
+
+
+def test_func_items_once_per_row(db, http_request):
+    calls = []
+
+    class CountController(RichController):
+        model = Article
+        list_display_items = ['title', 'func|counted']
+
+        def counted(self, obj):
+            calls.append(obj.pk)
+            return 'x'
+    for i in range(3):
+        Article.objects.create(title='a{}'.format(i), body='x')
+    views, _, _ = CountController.as_views('test')
+    assert_contains(views[0].callback(http_request('/article/list/')), 'counted')
+    assert sorted(calls) == sorted(Article.objects.values_list('pk', flat=True))
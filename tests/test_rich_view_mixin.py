@@ -1,6 +1,10 @@
+import copy
+
 import pytest
+from django.core.urlresolvers import NoReverseMatch, get_script_prefix, set_script_prefix
 from django.db import models
 
+from django_crud import links
 from django_crud.rich_views import RichViewMixin
 from django_crud.exceptions import AttrCrudError, SetupCrudError, ReverseCrudError
 from .models import Article
@@ -88,19 +92,87 @@ def test_buttons_drop_down():
     assert rv.process_buttons([{'dropdown': [{'url': '/a'}]}]) == [{'dropdown': [{'url': '/a'}]}]
 
 
-def test_buttons_rev_exc():
+def test_buttons_rev_exc(url_templates):
     class RV(RichViewMixin):
         model = Article
     with pytest.raises(ReverseCrudError):
         RV().process_buttons([{'url': 'rev|whatever'}])
 
 
-def test_buttons_rev(mocker):
+@pytest.yield_fixture
+def url_templates():
+    links._url_templates.clear()
+    yield
+    links._url_templates.clear()
+
+
+def test_buttons_rev(mocker, url_templates):
     def fake_reverse(viewname, args=None, kwargs=None):
         assert viewname == 'whatever'
         return '/fake_url/'
-    mocker.patch('django_crud.rich_views.reverse', fake_reverse)
+    mocker.patch('django_crud.links.reverse', fake_reverse)
 
     class RV(RichViewMixin):
         model = Article
     assert RV().process_buttons([{'url': 'rev|whatever'}]) == [{'url': '/fake_url/'}]
+
+
+def test_buttons_compiled_once(mocker, url_templates):
+    reversed_names = []
+
+    def fake_reverse(viewname, args=None, kwargs=None):
+        reversed_names.append((viewname, args))
+        if viewname == 'item' and not args:
+            raise NoReverseMatch()
+        return '/{}/{}'.format(viewname, args[0] if args else '')
+    mocker.patch('django_crud.links.reverse', fake_reverse)
+
+    class RV(RichViewMixin):
+        model = Article
+        visible = True
+        buttons = [
+            {'text': 'list', 'url': 'rev|list'},
+            {'text': 'item', 'url': 'rev|item', 'show_if': 'visible'},
+            'func|make_url',
+        ]
+
+        def make_url(self):
+            return '/made/'
+        make_url.short_description = 'Make {verbose_name}'
+    original = copy.deepcopy(RV.buttons)
+    rv = RV()
+    rv.object = Article(pk=1)
+    expected = [
+        {'text': 'list', 'url': '/list/'},
+        {'text': 'item', 'url': '/item/1', 'show_if': 'visible'},
+        {'text': 'Make Article', 'url': '/made/'},
+    ]
+    assert rv.process_buttons(rv.get_buttons()) == expected
+    sentinel = (links.SENTINEL_PK,)
+    assert reversed_names == [('list', None), ('item', None), ('item', sentinel)]
+    assert RV.buttons == original
+
+    rv = RV()
+    rv.object = Article(pk=2)
+    rv.visible = False
+    assert rv.process_buttons(rv.get_buttons()) == [expected[0], expected[2]]
+    rv.visible = True
+    assert rv.process_buttons(rv.get_buttons())[1]['url'] == '/item/2'
+    # urls aren't reversed again
+    assert len(reversed_names) == 3
+    assert RV.buttons == original
+
+
+def test_buttons_rev_script_prefix(mocker, url_templates):
+    mocker.patch('django_crud.links.reverse', lambda viewname, args=None: get_script_prefix() + 'list/')
+
+    class RV(RichViewMixin):
+        model = Article
+        buttons = [{'text': 'list', 'url': 'rev|list'}]
+
+    try:
+        for prefix in ('/', '/site-a/', '/site-b/'):
+            set_script_prefix(prefix)
+            assert RV().process_buttons(RV.buttons) == [{'text': 'list', 'url': prefix + 'list/'}]
+    finally:
+        set_script_prefix('/')
@@ -0,0 +1,190 @@
+import pytest
+from django.core.cache import cache
+from django.apps import apps
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import translation
+
+from django_crud.controllers import RichController
+from django_crud.exceptions import SetupCrudError
+from django_crud.rich_views import ItemDisplayMixin
+from django_crud.row_cache import version_key, connect_signals, _object_changed
+from .models import Article, Section, Tag, Event, Report
+from .test_rich_controllers import assert_contains, assert_not_contains
+
+
+@pytest.yield_fixture
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+class RowCacheSectionController(RichController):
+    model = Section
+    row_cache = True
+    list_display_items = ['short|text', 'article']
+
+
+class RowCacheTagController(RichController):
+    model = Tag
+    row_cache = True
+    list_display_items = ['name', 'articles']
+
+
+def render_list(ctrl_cls, http_request):
+    views, _, _ = ctrl_cls.as_views('test')
+    r = views[0].callback(http_request('/list/'))
+    r.render()
+    return r
+
+
+def test_rows_cached(db, http_request, clear_cache, mocker):
+    article = Article.objects.create(title='first article', body='x')
+    Section.objects.create(article=article, text='first section')
+    r = render_list(RowCacheSectionController, http_request)
+    assert_contains(r, 'first section')
+
+    gen_short_props = mocker.spy(ItemDisplayMixin, 'gen_short_props')
+    r = render_list(RowCacheSectionController, http_request)
+    assert_contains(r, 'first section')
+    assert_contains(r, 'first article')
+    assert gen_short_props.call_count == 0
+
+    Section.objects.create(article=article, text='second section')
+    r = render_list(RowCacheSectionController, http_request)
+    assert_contains(r, 'second section')
+    assert gen_short_props.call_count == 1
+
+
+def test_object_saved(db, http_request, clear_cache):
+    section = Section.objects.create(article=Article.objects.create(title='first article', body='x'), text='before')
+    assert_contains(render_list(RowCacheSectionController, http_request), 'before')
+    section.text = 'after'
+    section.save()
+    r = render_list(RowCacheSectionController, http_request)
+    assert_contains(r, 'after')
+    assert_not_contains(r, 'before')
+
+
+def test_signals_connected_on_startup(db, clear_cache):
+    # signals are connected by CrudConfig.ready() so changes invalidate rows cached by other processes
+    # even if this process has never built a RowCache for the model
+    event = Event.objects.create(title='event', kind='tk', date='2016-01-01')
+    keys = [version_key(Event), version_key(Event, event.pk)]
+    cache.set_many({k: 'v1' for k in keys}, None)
+    event.save()
+    assert cache.get_many(keys) == {}
+
+
+def test_signals_not_connected_by_default():
+    post_save.disconnect(dispatch_uid='crud-row-cache')
+    try:
+        with override_settings(CRUD_ROW_CACHE=False):
+            apps.get_app_config('django_crud').ready()
+        assert _object_changed not in [r() for _, r in post_save.receivers]
+    finally:
+        connect_signals()
+
+
+def test_row_cache_setting_required(db, http_request):
+    Section.objects.create(article=Article.objects.create(title='first article', body='x'), text='section')
+    with override_settings(CRUD_ROW_CACHE=False):
+        with pytest.raises(SetupCrudError):
+            render_list(RowCacheSectionController, http_request)
+
+
+def test_related_object_saved(db, http_request, clear_cache):
+    article = Article.objects.create(title='first article', body='x')
+    Section.objects.create(article=article, text='section')
+    assert_contains(render_list(RowCacheSectionController, http_request), 'first article')
+    article.title = 'changed article'
+    article.save()
+    assert_contains(render_list(RowCacheSectionController, http_request), 'changed article')
+
+
+def test_m2m_changed(db, http_request, clear_cache):
+    tag = Tag.objects.create(name='tag')
+    tag.articles.add(Article.objects.create(title='first article', body='x'))
+    assert_contains(render_list(RowCacheTagController, http_request), 'first article')
+    tag.articles.add(Article.objects.create(title='second article', body='x'))
+    assert_contains(render_list(RowCacheTagController, http_request), 'first article, second article')
+
+
+def test_update_version_field(db, http_request, clear_cache):
+    class VersionController(RichController):
+        model = Article
+        row_cache = True
+        row_version_field = 'slug'
+        list_display_items = ['title']
+
+    Article.objects.create(title='before', body='x', slug='v1')
+    assert_contains(render_list(VersionController, http_request), 'before')
+    # QuerySet.update doesn't send signals, rows are updated because row_version_field changes
+    Article.objects.update(title='after', slug='v2')
+    assert_contains(render_list(VersionController, http_request), 'after')
+
+
+def test_language_in_key(db, http_request, clear_cache):
+    Section.objects.create(article=Article.objects.create(title='first article', body='x'), text='section')
+    views, _, _ = RowCacheSectionController.as_views('test')
+    view = views[0].callback
+    with translation.override('en'):
+        view(http_request('/list/')).render()
+    keys = set(cache._cache)
+    with translation.override('de'):
+        view(http_request('/list/')).render()
+    assert len(set(cache._cache) - keys) == 1
+
+
+def test_bulk_update(db, http_request, clear_cache):
+    class BulkController(RichController):
+        model = Article
+        row_cache = True
+        list_display_items = ['title']
+        bulk_actions = [{'name': 'rename', 'text': 'Rename', 'update': {'title': 'after'}}]
+
+    article = Article.objects.create(title='before', body='x')
+    assert_contains(render_list(BulkController, http_request), 'before')
+    views, _, _ = BulkController.as_views('test')
+    views[-1].callback(http_request.post('/bulk/', {'action': 'rename', 'pk': [article.pk]}))
+    assert_contains(render_list(BulkController, http_request), 'after')
+
+
+def test_controller_mounted_twice(db, http_request, clear_cache):
+    class LinkController(RichController):
+        model = Section
+        row_cache = True
+        list_display_items = ['link|text']
+
+    section = Section.objects.create(article=Article.objects.create(title='first article', body='x'), text='section')
+    views, _, _ = LinkController.as_views('test')
+    view = views[0].callback
+    r = view(http_request('/site-a/list/'))
+    r.render()
+    assert_contains(r, 'href="/site-a/details/{}/"'.format(section.pk))
+    r = view(http_request('/site-b/list/'))
+    r.render()
+    assert_contains(r, 'href="/site-b/details/{}/"'.format(section.pk))
+    assert_not_contains(r, '/site-a/')
+
+
+def test_prune_columns_version_field(db, http_request, clear_cache):
+    class PrunedReportController(RichController):
+        model = Report
+        row_cache = True
+        row_version_field = 'modified'
+        prune_columns = True
+        list_display_items = ['title']
+
+    for i in range(5):
+        Report.objects.create(title='report {}'.format(i))
+    views, _, _ = PrunedReportController.as_views('test')
+    r = views[0].callback(http_request('/list/'))
+    with CaptureQueriesContext(connection) as ctx:
+        r.render()
+    assert_contains(r, 'report 4')
+    # one query for the page, row_version_field isn't loaded separately for each row
+    assert len(ctx) == 1
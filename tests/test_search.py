@@ -0,0 +1,103 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from django_crud import search
+from django_crud.controllers import RichController
+from django_crud.exceptions import SetupCrudError
+from django_crud.search import create_search_index, get_search_backend, SearchBackend
+from .models import Article, Section
+from .test_rich_controllers import assert_contains, assert_not_contains
+
+
+@pytest.yield_fixture
+def search_index(db):
+    create_search_index(Article, ['title', 'body'])
+    yield
+    search._index_exists.clear()
+
+
+@pytest.fixture
+def articles(db):
+    return [
+        Article.objects.create(title='apple pie', body='with cream'),
+        Article.objects.create(title='banana bread', body='no cream'),
+        Article.objects.create(title='cherry cake', body='"quoted" AND stuff'),
+    ]
+
+
+def search_titles(query, fields=('title', 'body')):
+    qs = Article.objects.order_by('pk')
+    return [a.title for a in get_search_backend(Article, fields).filter(qs, query)]
+
+
+def test_icontains(articles):
+    assert search_titles('cream') == ['apple pie', 'banana bread']
+    assert search_titles('CREAM no') == ['banana bread']
+    assert search_titles('ppl') == ['apple pie']
+
+
+def test_index(articles, search_index):
+    with CaptureQueriesContext(connection) as ctx:
+        assert search_titles('cream') == ['apple pie', 'banana bread']
+    assert 'MATCH' in ctx[-1]['sql']
+    assert 'LIKE' not in ctx[-1]['sql']
+    assert search_titles('CREAM no') == ['banana bread']
+    # terms match the start of words
+    assert search_titles('ban') == ['banana bread']
+    assert search_titles('"quoted" AND') == ['cherry cake']
+    assert search_titles('NEAR(') == []
+
+
+def test_index_kept_up_to_date(articles, search_index):
+    Article.objects.filter(pk=articles[0].pk).update(title='apricot tart')
+    Article.objects.bulk_create([Article(title='apricot jam', body='x')])
+    assert search_titles('apricot') == ['apricot tart', 'apricot jam']
+    articles[1].delete()
+    assert search_titles('cream') == ['apricot tart']
+
+
+def test_index_other_fields(articles, search_index):
+    # there's no index of title alone
+    with CaptureQueriesContext(connection) as ctx:
+        assert search_titles('apple', ['title']) == ['apple pie']
+    assert 'LIKE' in ctx[-1]['sql']
+
+
+def test_related_fields(db, search_index):
+    Section.objects.create(article=Article.objects.create(title='apple pie', body='x'), text='first')
+    Section.objects.create(article=Article.objects.create(title='banana bread', body='x'), text='second')
+    backend = get_search_backend(Section, ['article__title', 'text'])
+    assert not backend.index_exists()
+    assert [s.text for s in backend.filter(Section.objects.all(), 'banana')] == ['second']
+
+
+class SearchArticleController(RichController):
+    model = Article
+    list_display_items = ['title']
+    search_fields = ['title', 'body']
+
+
+def test_list_view(articles, http_request):
+    views, _, _ = SearchArticleController.as_views('test')
+    r = views[0].callback(http_request('/article/list/?q=cream'))
+    assert_contains(r, 'apple pie')
+    assert_not_contains(r, 'cherry cake')
+    assert_contains(r, '<form method="get" class="search-form">')
+    assert_contains(r, 'value="cream"')
+    assert r.context_data['get_without_page'].urlencode() == 'q=cream'
+    r = views[0].callback(http_request('/article/list/?q=cream&page=1'))
+    assert r.context_data['get_without_page'].urlencode() == 'q=cream'
+
+
+def test_list_view_no_search(articles, http_request):
+    views, _, _ = SearchArticleController.as_views('test')
+    r = views[0].callback(http_request('/article/list/'))
+    assert_contains(r, 'apple pie')
+    assert_contains(r, 'cherry cake')
+    assert not r.context_data['get_without_page']
+
+
+def test_index_not_supported(db):
+    with pytest.raises(SetupCrudError):
+        SearchBackend(Article, ['title']).create_index()
@@ -0,0 +1,75 @@
+import re
+
+import pytest
+from django.db import connection
+from django.http import Http404
+from django.test import override_settings
+
+from django_crud.timing import server_timing
+from .models import Article
+from .test_rich_controllers import ArticleControllerMore, JsonTagController
+
+
+def timing_phases(header):
+    return [part.split(';')[0] for part in header.split(', ')]
+
+
+@override_settings(CRUD_SERVER_TIMING=True)
+def test_list_timing(db, http_request):
+    Article.objects.create(title='article', body='x')
+    received = []
+
+    def receiver(sender, request, view, timing, **kwargs):
+        received.append((request.path, timing.queries))
+    server_timing.connect(receiver)
+    try:
+        views, _, _ = ArticleControllerMore.as_views('test')
+        r = views[0].callback(http_request('/article/list/'))
+        assert not r.has_header('Server-Timing')
+        r.render()
+    finally:
+        server_timing.disconnect(receiver)
+    header = r['Server-Timing']
+    assert timing_phases(header) == ['queryset', 'buttons', 'formatting', 'render', 'db', 'total']
+    assert re.search(r'db;dur=\d+\.\d\d;desc="2 queries"', header)
+    assert received == [('/article/list/', 2)]
+    assert not connection.force_debug_cursor
+
+
+@override_settings(CRUD_SERVER_TIMING=True)
+def test_json_timing(db, http_request):
+    views, _, _ = JsonTagController.as_views('test')
+    r = views[5].callback(http_request('/tags/list.json'))
+    assert timing_phases(r['Server-Timing']) == ['queryset', 'db', 'total']
+    assert not connection.force_debug_cursor
+
+
+@override_settings(CRUD_SERVER_TIMING=True)
+def test_timing_exception(db, http_request):
+    views, _, _ = ArticleControllerMore.as_views('test')
+    with pytest.raises(Http404):
+        views[1].callback(http_request('/article/details/123/'), pk=123)
+    assert not connection.force_debug_cursor
+
+
+@override_settings(CRUD_SERVER_TIMING=True)
+def test_timing_render_exception(db, http_request):
+    class FailingController(ArticleControllerMore):
+        list_display_items = ['func|fail']
+
+        def fail(self, obj):
+            raise ValueError('failed to render')
+
+    Article.objects.create(title='article', body='x')
+    views, _, _ = FailingController.as_views('test')
+    r = views[0].callback(http_request('/article/list/'))
+    with pytest.raises(ValueError):
+        r.render()
+    assert not connection.force_debug_cursor
+
+
+def test_timing_disabled(db, http_request):
+    views, _, _ = ArticleControllerMore.as_views('test')
+    r = views[0].callback(http_request('/article/list/'))
+    r.render()
+    assert not r.has_header('Server-Timing')
@@ -1,8 +1,12 @@
+import threading
+
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from django_crud.base_views import CtrlListView
-from django_crud.controllers import VanillaController
-from .models import Article
+from django_crud.controllers import VanillaController, RichController
+from .models import Article, Report
 
 
 class VanArticleController(VanillaController):
@@ -42,3 +46,114 @@ def test_controller_init_as_views():
 def test_controller_init_as_views_instance():
     with pytest.raises(AttributeError):
         VanArticleController().as_views('test')
+
+
+class ReportController(RichController):
+    model = Report
+    last_modified_field = 'modified'
+    cache_control = {'private': True, 'max_age': 0}
+    vary_headers = ['Cookie']
+    list_display_items = ['title']
+    detail_display_items = ['title']
+
+
+def test_conditional_list(db, http_request):
+    report = Report.objects.create(title='first report')
+    views, _, _ = ReportController.as_views('test')
+    r = views[0].callback(http_request('/list/'))
+    assert r.status_code == 200
+    assert r['Cache-Control'] in ('private, max-age=0', 'max-age=0, private')
+    assert r['Vary'] == 'Cookie'
+    etag, last_modified = r['ETag'], r['Last-Modified']
+
+    r = views[0].callback(http_request.get('/list/', HTTP_IF_NONE_MATCH=etag))
+    assert r.status_code == 304
+    assert r['ETag'] == etag
+    assert r['Vary'] == 'Cookie'
+    r = views[0].callback(http_request.get('/list/', HTTP_IF_MODIFIED_SINCE=last_modified))
+    assert r.status_code == 304
+    r = views[0].callback(http_request.get('/list/?page=1', HTTP_IF_NONE_MATCH=etag))
+    assert r.status_code == 200
+
+    Report.objects.create(title='second report')
+    r = views[0].callback(http_request.get('/list/', HTTP_IF_NONE_MATCH=etag))
+    assert r.status_code == 200
+    assert r['ETag'] != etag
+    etag = r['ETag']
+    report.delete()
+    r = views[0].callback(http_request.get('/list/', HTTP_IF_NONE_MATCH=etag))
+    assert r.status_code == 200
+
+
+def test_conditional_detail(db, http_request):
+    report = Report.objects.create(title='first report')
+    views, _, _ = ReportController.as_views('test')
+    r = views[1].callback(http_request('/details/{}/'.format(report.pk)), pk=report.pk)
+    assert r.status_code == 200
+    etag = r['ETag']
+    r = views[1].callback(http_request.get('/details/{}/'.format(report.pk), HTTP_IF_NONE_MATCH=etag), pk=report.pk)
+    assert r.status_code == 304
+    report.title = 'changed'
+    report.save()
+    r = views[1].callback(http_request.get('/details/{}/'.format(report.pk), HTTP_IF_NONE_MATCH=etag), pk=report.pk)
+    assert r.status_code == 200
+    assert 'changed' in r.rendered_content
+
+
+def test_conditional_detail_prune_columns(db, http_request):
+    class PrunedReportController(ReportController):
+        prune_columns = True
+
+    report = Report.objects.create(title='first report')
+    views, _, _ = PrunedReportController.as_views('test')
+    with CaptureQueriesContext(connection) as ctx:
+        r = views[1].callback(http_request('/details/{}/'.format(report.pk)), pk=report.pk)
+    assert r.status_code == 200
+    assert r.has_header('ETag')
+    # last_modified_field is loaded with the object rather than deferred
+    assert len(ctx) == 1
+
+
+def test_no_conditional(db, http_request):
+    Article.objects.create(title='article', body='x')
+    views, _, _ = VanArticleController.as_views('test')
+    r = views[0].callback(http_request.get('/list/', HTTP_IF_NONE_MATCH='*'))
+    assert r.status_code == 200
+    assert not r.has_header('ETag')
+
+
+def test_threaded_requests(http_request):
+    barrier = threading.Barrier(2, timeout=5)
+    urls = {}
+
+    class ThreadController(VanillaController):
+        model = Article
+
+        def get_queryset(self):
+            return self.model.objects.none()
+
+        def update_context(self):
+            # wait until both requests have started so each would see the other's request if state was shared
+            barrier.wait()
+            urls[self.request.path] = self.relative_url('create')
+            return {}
+
+    views, _, _ = ThreadController.as_views('test')
+    threads = [threading.Thread(target=views[0].callback, args=(http_request(path),))
+               for path in ('/first/list/', '/second/list/')]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert urls == {'/first/list/': '/first/create/', '/second/list/': '/second/create/'}
+
+
+@pytest.mark.parametrize('path,rel_url,expected', [
+    ('/articles/list/', 'create', '/articles/create/'),
+    ('/articles/details/12/', '/update/12/', '/articles/update/12/'),
+    ('/a/list/b/details/3/', 'list', '/a/list/b/list/'),
+    ('/somewhere/else/', 'list', '/somewhere/else/'),
+])
+def test_relative_url(http_request, path, rel_url, expected):
+    ctrl = VanArticleController().bind(http_request(path), (), {})
+    assert ctrl.relative_url(rel_url) == expected